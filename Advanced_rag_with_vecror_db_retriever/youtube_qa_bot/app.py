@@ -8,8 +8,8 @@ from langchain_community.vectorstores import FAISS  # For efficient vector stora
 from langchain.chains import LLMChain  # For creating chains of operations with LLMs
 from langchain.prompts import PromptTemplate  # For defining prompt templates
 
-from langchain_groq import ChatGroq
-from langchain_mistralai import MistralAIEmbeddings
+from backends import create_chat_model, create_embeddings
+from embedding_executor import EmbeddingExecutor
 import os
 from dotenv import load_dotenv
 
@@ -17,16 +17,29 @@ load_dotenv()
 model_id = "llama-3.1-8b-instant" # 	qwen/qwen3-32b  openai/gpt-oss-20b llama-3.1-8b-instant
 groq_api_key = os.getenv("GROQ_API_KEY")
 mistral_api_key = os.getenv("MISTRAL_API_KEY")
-llm = ChatGroq(model=model_id,
-            temperature=0,
-            max_tokens=300,
-            timeout=None,
-            max_retries=2,
-            verbose=1)
-
-embeddings = MistralAIEmbeddings(
-        model="mistral-embed"
-    )
+
+# LLM_BACKEND=fake and EMBEDDING_BACKEND=hashing run the bot offline with local stand-ins
+LLM_BACKEND = os.getenv("LLM_BACKEND", "groq")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "mistral")
+
+# Embedding requests are batched by token count and sent a few at a time
+EMBEDDING_MAX_BATCH_TOKENS = int(os.getenv("EMBEDDING_MAX_BATCH_TOKENS", "8000"))
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+EMBEDDING_REQUESTS_PER_MINUTE = float(os.getenv("EMBEDDING_REQUESTS_PER_MINUTE", "0"))
+
+def create_llm():
+    return create_chat_model(LLM_BACKEND, model_id,
+                temperature=0,
+                max_tokens=300,
+                timeout=None,
+                max_retries=2,
+                verbose=1)
+
+def create_embedding_model():
+    return create_embeddings(EMBEDDING_BACKEND, "mistral-embed")
+
+llm = create_llm()
+embeddings = create_embedding_model()
 
 
 # %% get youtube video id
@@ -127,8 +140,15 @@ def create_faiss_index(chunks, embedding_model):
     :param embedding_model: The embedding model to use
     :return: FAISS index
     """
-    # Use the FAISS library to create an index from the provided text chunks
-    return FAISS.from_texts(chunks, embedding_model)
+    # Embed the chunks in concurrent token-bounded batches, then build the FAISS index from the vectors
+    executor = EmbeddingExecutor(
+        embedding_model.embed_documents,
+        max_batch_tokens=EMBEDDING_MAX_BATCH_TOKENS,
+        max_concurrency=EMBEDDING_MAX_CONCURRENCY,
+        requests_per_minute=EMBEDDING_REQUESTS_PER_MINUTE,
+    )
+    vectors = executor.embed(chunks)
+    return FAISS.from_embeddings(list(zip(chunks, vectors.tolist())), embedding_model)
 
 def perform_similarity_search(faiss_index, query, k=3):
     """
@@ -367,17 +387,8 @@ def answer_question(video_url, user_question):
 
     if processed_transcript and user_question:
         
-        model_id = "llama-3.1-8b-instant" # 	qwen/qwen3-32b  openai/gpt-oss-20b llama-3.1-8b-instant
-        llm = ChatGroq(model=model_id,
-                    temperature=0,
-                    max_tokens=300,
-                    timeout=None,
-                    max_retries=2,
-                    verbose=1)
-        
-        embedding_model = MistralAIEmbeddings(
-            model="mistral-embed"
-        )
+        llm = create_llm()
+        embedding_model = create_embedding_model()
         
         # Step 1: Chunk the transcript (only for Q&A)
         chunks = chunk_transcript(processed_transcript)
@@ -0,0 +1,172 @@
+"""Concurrent, token-bounded batch embedding.
+
+Texts are grouped into batches of at most ``max_batch_tokens`` estimated
+tokens, and several batches are sent at once. A 413 (payload too large)
+splits the failed batch and a 429 (rate limited) retries it with backoff;
+both halve the token budget of later batches, which grows back by a
+quarter after each success.
+
+This module is kept byte-identical in DocChat (retriever/), the YouTube
+bot and the icebreaker bot (modules/); change every copy together.
+"""
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    # About four characters per token for English text with BPE tokenizers
+    return len(text) // 4 + 1
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is None:
+        name, message = type(error).__name__, str(error)
+        if "RateLimit" in name or "429" in message:
+            return 429
+        if "413" in message or "too large" in message.lower():
+            return 413
+    return status
+
+
+class EmbeddingExecutor:
+    """Embeds texts through a batch embedding function in concurrent, adaptively sized batches.
+
+    At most ``max_concurrency`` requests are in flight across all callers,
+    and request starts are spaced to stay within ``requests_per_minute``
+    (0 for no pacing).
+
+    Args:
+        embed_batch: Function embedding a list of texts, e.g. a LangChain
+            model's ``embed_documents`` or a LlamaIndex model's
+            ``get_text_embedding_batch``.
+        max_batch_tokens: Largest estimated token count of one request.
+        max_batch_size: Largest number of texts in one request.
+        max_concurrency: Number of requests sent at once.
+        requests_per_minute: Request rate limit, or 0 for none.
+        max_retries: Retries of a rate-limited request.
+        min_batch_tokens: Floor of the adaptive token budget.
+    """
+
+    def __init__(
+        self,
+        embed_batch: Callable[[List[str]], Sequence[Sequence[float]]],
+        max_batch_tokens: int = 8000,
+        max_batch_size: int = 128,
+        max_concurrency: int = 4,
+        requests_per_minute: float = 0.0,
+        max_retries: int = 5,
+        min_batch_tokens: int = 512
+    ):
+        self.embed_batch = embed_batch
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_concurrency = max_concurrency
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self.max_retries = max_retries
+        self.min_batch_tokens = min(min_batch_tokens, max_batch_tokens)
+        self.batch_tokens = max_batch_tokens
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._next_start = 0.0
+        self._lock = threading.Lock()
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Embeds texts and returns their vectors in input order.
+
+        Args:
+            texts: Texts to be embedded.
+
+        Returns:
+            Contiguous float32 array with one row per text.
+        """
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        job = {"texts": texts, "tokens": [estimate_tokens(t) for t in texts], "next": 0, "out": None}
+        workers = min(self.max_concurrency, len(texts))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embed") as pool:
+            # Each worker pulls the next batch once it is free, sized by the current token budget
+            futures = [pool.submit(self._work, job) for _ in range(workers)]
+            for future in futures:
+                future.result()
+        return job["out"]
+
+    def run(self, function: Callable[..., Any], *args: Any) -> Any:
+        """Calls ``function(*args)`` under the executor's concurrency and rate limits, e.g. for a query embedding."""
+        with self._slots:
+            self._pace()
+            return function(*args)
+
+    def _work(self, job) -> None:
+        try:
+            while True:
+                batch = self._next_batch(job)
+                if not batch:
+                    return
+                self._embed(job, batch)
+        except BaseException:
+            # Stop the other workers from taking further batches of a failed job
+            with self._lock:
+                job["next"] = len(job["texts"])
+            raise
+
+    def _next_batch(self, job) -> List[int]:
+        with self._lock:
+            start = job["next"]
+            stop, budget = start, self.batch_tokens
+            while stop < len(job["texts"]) and stop - start < self.max_batch_size:
+                if stop > start and job["tokens"][stop] > budget:
+                    break
+                budget -= job["tokens"][stop]
+                stop += 1
+            job["next"] = stop
+            return list(range(start, stop))
+
+    def _embed(self, job, batch: List[int]) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                vectors = self.run(self.embed_batch, [job["texts"][i] for i in batch])
+            except Exception as e:
+                status = _status_code(e)
+                if status == 413 and len(batch) > 1:
+                    self._shrink(f"request too large for {len(batch)} texts")
+                    half = len(batch) // 2
+                    self._embed(job, batch[:half])
+                    self._embed(job, batch[half:])
+                    return
+                if status == 429 and attempt < self.max_retries:
+                    self._shrink("rate limited")
+                    time.sleep(min(30.0, 2 ** attempt) + random.uniform(0, 0.5))
+                    continue
+                raise
+            vectors = np.asarray(vectors, dtype=np.float32)
+            with self._lock:
+                if job["out"] is None:
+                    job["out"] = np.empty((len(job["texts"]), vectors.shape[1]), dtype=np.float32)
+                self.batch_tokens = min(self.max_batch_tokens, self.batch_tokens + self.batch_tokens // 4)
+            job["out"][batch[0]:batch[-1] + 1] = vectors
+            return
+
+    def _pace(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        time.sleep(start - now)
+
+    def _shrink(self, reason: str) -> None:
+        with self._lock:
+            self.batch_tokens = max(self.min_batch_tokens, self.batch_tokens // 2)
+            logger.warning(f"Embedding {reason}; batch budget lowered to {self.batch_tokens} tokens")
@@ -0,0 +1,144 @@
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+from .retrieval_cache import normalize_question
+
+logger = logging.getLogger(__name__)
+
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def question_numbers(question: str) -> Tuple[str, ...]:
+    """The numbers in a question (years, amounts, ...), sorted; paraphrases must agree on them."""
+    return tuple(sorted(_NUMBER_RE.findall(question)))
+
+
+class _Entry:
+    __slots__ = ("question", "numbers", "vector", "result", "created")
+
+    def __init__(self, question: str, vector: Optional[np.ndarray], result: Dict, created: float):
+        self.question = question
+        self.numbers = question_numbers(question)
+        self.vector = vector
+        self.result = result
+        self.created = created
+
+
+class AnswerCache:
+    """Caches finished answers per corpus and matches new questions by embedding similarity.
+
+    Entries are keyed by (corpus fingerprint, normalized question). A
+    repeated question is answered without embedding it; a paraphrase is
+    answered when the cosine similarity of its embedding to a cached
+    question on the same corpus reaches ``similarity_threshold`` and both
+    contain the same numbers, so "PUE in 2019" never answers "PUE in
+    2022". Only questions with such candidates are embedded. Entries
+    expire after ``ttl_seconds`` and the least recently used are dropped
+    beyond ``max_entries``.
+    """
+
+    def __init__(self, embeddings_factory, similarity_threshold: float, ttl_seconds: float, max_entries: int):
+        self._embeddings_factory = embeddings_factory
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[Hashable, str], _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def lookup(self, fingerprint: Hashable, question: str) -> Tuple[Optional[Dict], Optional[np.ndarray]]:
+        """Return ``(cached result or None, question embedding or None)``.
+
+        The embedding, if one was computed, is returned so that ``store``
+        does not compute it again.
+        """
+        if self.max_entries <= 0:
+            return None, None
+        key = (fingerprint, normalize_question(question))
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.result, entry.vector
+            numbers = question_numbers(question)
+            candidates = [
+                (k, e) for k, e in self._entries.items()
+                if k[0] == fingerprint and e.vector is not None and e.numbers == numbers
+            ]
+
+        # Without candidates there is nothing to compare against; store embeds the question if it caches one
+        if not candidates:
+            self._count_miss()
+            return None, None
+        vector = self._embed(question)
+        if vector is None:
+            self._count_miss()
+            return None, None
+
+        similarities = np.stack([e.vector for _, e in candidates]) @ vector
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            self._count_miss()
+            return None, vector
+
+        best_key, best_entry = candidates[best]
+        with self._lock:
+            if best_key in self._entries:
+                self._entries.move_to_end(best_key)
+            self.hits += 1
+            self.semantic_hits += 1
+        logger.info(
+            f"Answer cache: '{question}' matched '{best_entry.question}' "
+            f"(similarity {similarities[best]:.3f})"
+        )
+        return best_entry.result, vector
+
+    def store(self, fingerprint: Hashable, question: str, result: Dict, vector: Optional[np.ndarray] = None) -> None:
+        if self.max_entries <= 0:
+            return
+        if vector is None:
+            vector = self._embed(question)
+        key = (fingerprint, normalize_question(question))
+        with self._lock:
+            self._entries[key] = _Entry(question, vector, dict(result), time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+            }
+
+    def _count_miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.ttl_seconds
+        for key in [k for k, e in self._entries.items() if e.created < cutoff]:
+            del self._entries[key]
+
+    def _embed(self, question: str) -> Optional[np.ndarray]:
+        """Unit-normalized question embedding, or None if the embedding call fails."""
+        try:
+            vector = np.asarray(self._embeddings_factory().embed_query(question), dtype=np.float32)
+        except Exception as e:
+            logger.warning(f"Answer cache could not embed the question, exact matches only: {e}")
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
@@ -0,0 +1,104 @@
+import logging
+import re
+from typing import List, Optional
+
+from langchain.schema import Document
+
+logger = logging.getLogger(__name__)
+
+_CITATION_RE = re.compile(r"\[(\d+)\]")
+_WORD_RE = re.compile(r"\w+")
+_encoding = None
+_encoding_loaded = False
+
+
+def estimate_tokens(text: str) -> int:
+    """Count tokens with tiktoken's cl100k_base when it is available locally, else ~4 chars per token."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.info(f"tiktoken unavailable ({e}); estimating tokens from character count")
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def _rank_score(doc: Document) -> float:
+    metadata = doc.metadata
+    return metadata.get("rerank_score", metadata.get("ensemble_score", 0.0))
+
+
+class ContextPacker:
+    """Selects retrieved chunks for a prompt under a token budget.
+
+    Chunks are ranked by ``metadata["rerank_score"]`` when a reranker
+    scored them, else by ``metadata["ensemble_score"]`` (falling back to
+    retrieval order); near-duplicates are dropped, and chunks are added in
+    rank order while they fit. Packed chunks are copies numbered under
+    ``metadata["citation"]`` so answers can cite them as ``[n]``.
+    """
+
+    def __init__(self, token_budget: int, dedup_threshold: float = 0.8, shingle_size: int = 5):
+        self.token_budget = token_budget
+        self.dedup_threshold = dedup_threshold
+        self.shingle_size = shingle_size
+
+    def pack(self, documents: List[Document]) -> List[Document]:
+        ranked = sorted(
+            enumerate(documents),
+            key=lambda item: (-_rank_score(item[1]), item[0])
+        )
+        packed, shingle_sets = [], []
+        used_tokens = 0
+        for _, doc in ranked:
+            shingles = self._shingles(doc.page_content)
+            if any(self._overlap(shingles, other) >= self.dedup_threshold for other in shingle_sets):
+                continue
+            tokens = estimate_tokens(doc.page_content)
+            # The top-ranked chunk is always kept, even if it alone exceeds the budget
+            if packed and used_tokens + tokens > self.token_budget:
+                continue
+            used_tokens += tokens
+            shingle_sets.append(shingles)
+            packed.append(Document(
+                page_content=doc.page_content,
+                metadata={**doc.metadata, "citation": len(packed) + 1}
+            ))
+
+        logger.info(
+            f"Packed {len(packed)} of {len(documents)} chunks into ~{used_tokens} tokens "
+            f"(budget {self.token_budget})"
+        )
+        return packed
+
+    def _shingles(self, text: str) -> set:
+        words = _WORD_RE.findall(text.lower())
+        if len(words) <= self.shingle_size:
+            return {tuple(words)}
+        return {tuple(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+
+    @staticmethod
+    def _overlap(a: set, b: set) -> float:
+        """Share of the smaller shingle set found in the other, so contained chunks count as duplicates."""
+        if not a or not b:
+            return 0.0
+        return len(a & b) / min(len(a), len(b))
+
+
+def format_context(documents: List[Document]) -> str:
+    """Join chunks into prompt context, prefixing each with its ``[n]`` citation label."""
+    parts = []
+    for i, doc in enumerate(documents, start=1):
+        parts.append(f"[{doc.metadata.get('citation', i)}] {doc.page_content}")
+    return "\n\n".join(parts)
+
+
+def cited_documents(answer: str, documents: List[Document]) -> Optional[List[Document]]:
+    """Return the packed chunks an answer cites, or None if it cites none of them."""
+    cited = {int(n) for n in _CITATION_RE.findall(answer)}
+    selected = [doc for doc in documents if doc.metadata.get("citation") in cited]
+    return selected or None
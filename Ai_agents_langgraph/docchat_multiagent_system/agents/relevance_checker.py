@@ -1,30 +1,20 @@
 # from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 from langchain.schema.output_parser import StrOutputParser
+from langchain.schema import Document
+from typing import Dict, List, Optional, Tuple
 from config.settings import settings
-import os
-import json
-from langchain_core.tools import tool
-from langchain_groq import ChatGroq
-from langchain_mistralai import MistralAIEmbeddings
+from utils.llm_gateway import get_llm
+from utils.tracing import current_span
+from .relevance_prefilter import RelevancePreClassifier
+import logging
 
-from dotenv import load_dotenv
-
-load_dotenv()
-
-groq_api_key = os.getenv("GROQ_API_KEY")
-mistral_api_key = os.getenv("MISTRAL_API_KEY")
+logger = logging.getLogger(__name__)
 
 class RelevanceChecker:
     def __init__(self):
-        model_id = "qwen/qwen3-32b" # 	qwen/qwen3-32b  openai/gpt-oss-120b llama3-8b-8192 
-    
-        self.llm = ChatGroq(model=model_id,
-            temperature=0,
-            max_tokens=None,
-            timeout=None,
-            max_retries=2,
-            verbose=1)
+        # Model comes from settings (RELEVANCE_MODEL, else LLM_MODEL)
+        self.llm = get_llm("relevance")
 
         self.prompt = ChatPromptTemplate.from_template(
             """
@@ -50,50 +40,101 @@ class RelevanceChecker:
 
         self.chain = self.prompt | self.llm | StrOutputParser()
 
-    def check(self, question: str, retriever, k=3) -> str:
+        # Clear-cut cases are classified from retrieval scores without an LLM call
+        self.prefilter = RelevancePreClassifier(
+            no_match_coverage=settings.RELEVANCE_NO_MATCH_COVERAGE,
+            no_match_similarity=settings.RELEVANCE_NO_MATCH_SIMILARITY,
+            no_match_bm25=settings.RELEVANCE_NO_MATCH_BM25,
+            can_answer_coverage=settings.RELEVANCE_CAN_ANSWER_COVERAGE,
+            can_answer_similarity=settings.RELEVANCE_CAN_ANSWER_SIMILARITY,
+            can_answer_bm25=settings.RELEVANCE_CAN_ANSWER_BM25
+        )
+
+    def check(self, question: str, documents: List[Document], k=3) -> str:
         """
-        1. Retrieve the top-k document chunks from the global retriever.
-        2. Combine them into a single text string.
-        3. Pass that text + question to the LLM chain for classification.
+        1. Take the top-k chunks of the documents already retrieved for the question.
+        2. Classify clear-cut cases from their retrieval scores (see ``RelevancePreClassifier``).
+        3. Otherwise combine the chunks into a single text string and
+           pass that text + question to the LLM chain for classification.
         
         Returns: "CAN_ANSWER" or "PARTIAL" or "NO_MATCH".
         """
+        features, classification = self._prefilter(question, documents, k)
+        if classification is not None:
+            return classification
 
-        print(f"[DEBUG] RelevanceChecker.check called with question='{question}' and k={k}")
-        
-        # Retrieve doc chunks from the ensemble retriever
-        top_docs = retriever.invoke(question)
-        if not top_docs:
-            print("[DEBUG] No documents returned from retriever.invoke(). Classifying as NO_MATCH.")
-            return "NO_MATCH"
+        # Call the LLM
+        inputs = self._build_inputs(question, documents, k)
+        response = self.chain.invoke(inputs).strip()
+        return self._escalated(features, self._parse_classification(response))
+
+    async def acheck(self, question: str, documents: List[Document], k=3) -> str:
+        """Async variant of ``check`` using the chain's ``ainvoke``."""
+        features, classification = self._prefilter(question, documents, k)
+        if classification is not None:
+            return classification
+
+        inputs = self._build_inputs(question, documents, k)
+        response = (await self.chain.ainvoke(inputs)).strip()
+        return self._escalated(features, self._parse_classification(response))
+
+    def _prefilter(self, question: str, documents: List[Document], k: int) -> Tuple[Optional[Dict], Optional[str]]:
+        logger.debug(f"RelevanceChecker.check called with question='{question}' and k={k}")
+        if not documents:
+            logger.debug("No documents were retrieved. Classifying as NO_MATCH.")
+            self.prefilter.record("no_documents")
+            current_span().set(path="no_documents")
+            return None, "NO_MATCH"
+        # Features are computed even with the fast path off, so escalated checks log them for calibration
+        features = self.prefilter.features(question, documents[:k])
+        if not settings.RELEVANCE_FAST_PATH:
+            return features, None
+        classification = self.prefilter.classify(features)
+        if classification is not None:
+            path = f"fast_{classification.lower()}"
+            logger.debug(f"Classified as '{classification}' from retrieval features {features}")
+            self.prefilter.record(path)
+            current_span().set(path=path, **(features or {}))
+        return features, classification
+
+    def _escalated(self, features: Optional[Dict], classification: str) -> str:
+        # Logged with the features so the fast-path thresholds can be calibrated against the LLM's labels
+        logger.debug(f"LLM classified '{classification}' for retrieval features {features}")
+        self.prefilter.record("llm")
+        current_span().set(path="llm", **(features or {}))
+        return classification
+
+    def _build_inputs(self, question: str, documents: List[Document], k: int):
+        top_docs = documents
 
         # Print how many docs were retrieved in total
-        print(f"[DEBUG] Retriever returned {len(top_docs)} docs. Now taking top {k} to feed LLM.")
+        logger.debug(f"Received {len(top_docs)} retrieved docs. Now taking top {k} to feed LLM.")
 
         # Show a quick snippet of each chunk for debugging
         for i, doc in enumerate(top_docs[:k]):
             snippet = doc.page_content[:200].replace("\n", "\\n")
-            print(f"[DEBUG] Chunk #{i+1} preview (first 200 chars): {snippet}...")
+            logger.debug(f"Chunk #{i+1} preview (first 200 chars): {snippet}...")
 
         # Combine the top k chunk texts into one string
         document_content = "\n\n".join(doc.page_content for doc in top_docs[:k])
-        print(f"[DEBUG] Combined text length for top {k} chunks: {len(document_content)} chars.")
+        current_span().set(documents=len(top_docs[:k]), context_chars=len(document_content))
+        logger.debug(f"Combined text length for top {k} chunks: {len(document_content)} chars.")
 
-        # Call the LLM
-        response = self.chain.invoke({
+        return {
             "question": question, 
             "document_content": document_content
-        }).strip()
-        
-        print(f"[DEBUG] LLM raw classification response: '{response}'")
+        }
+
+    def _parse_classification(self, response: str) -> str:
+        logger.debug(f"LLM raw classification response: '{response}'")
 
         # Convert to uppercase, check if it's one of our valid labels
         classification = response.upper()
         valid_labels = {"CAN_ANSWER", "PARTIAL", "NO_MATCH"}
         if classification not in valid_labels:
-            print("[DEBUG] LLM did not respond with a valid label. Forcing 'NO_MATCH'.")
+            logger.debug("LLM did not respond with a valid label. Forcing 'NO_MATCH'.")
             classification = "NO_MATCH"
         else:
-            print(f"[DEBUG] Classification recognized as '{classification}'.")
+            logger.debug(f"Classification recognized as '{classification}'.")
 
         return classification
@@ -0,0 +1,119 @@
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+from langchain.schema import Document
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+")
+
+# Question words and function words that say nothing about the topic
+_STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be been before being below between both but by
+can could did do does doing during each few for from further had has have having he her here hers him his
+how i if in into is it its itself just me more most my no nor not of off on once only or other our ours out
+over own same she should so some such than that the their theirs them then there these they this those
+through to too under until up very was we were what when where which while who whom why will with would you
+your yours tell give explain describe list please
+""".split())
+
+
+def content_terms(text: str) -> set:
+    return {word for word in _WORD_RE.findall(text.lower()) if word not in _STOPWORDS}
+
+
+def cosine_similarity(relevance: float) -> float:
+    """Invert LangChain's relevance score for Chroma's "l2" space, 1 - d / sqrt(2), into cosine similarity.
+
+    Chroma reports the squared L2 distance d, which is 2 - 2 cos for
+    unit-length embeddings. Relevance goes negative below a cosine of
+    about 0.29, so it is not clamped.
+    """
+    return 1.0 - (1.0 - relevance) / math.sqrt(2)
+
+
+class RelevancePreClassifier:
+    """Classifies clear-cut relevance checks from retrieval scores, leaving ambiguous ones to the LLM.
+
+    Looks at the top-k retrieved chunks: the share of the question's
+    content terms they cover (together and in the best single chunk), the
+    best BM25 score (``metadata["bm25_score"]``) and the best cosine
+    similarity, recovered from Chroma's relevance score
+    (``metadata["vector_score"]``). A question whose terms barely occur
+    and whose best chunk is semantically distant is ``NO_MATCH``; one
+    whose terms nearly all occur in a single chunk that also scores high
+    on both retrievers is ``CAN_ANSWER``. Anything else,
+    or chunks without vector scores, returns None.
+
+    Counts how often each path is taken; ``stats()`` returns the counts.
+    """
+
+    PATHS = ("no_documents", "fast_no_match", "fast_can_answer", "llm")
+
+    def __init__(
+        self,
+        no_match_coverage: float,
+        no_match_similarity: float,
+        no_match_bm25: float,
+        can_answer_coverage: float,
+        can_answer_similarity: float,
+        can_answer_bm25: float
+    ):
+        self.no_match_coverage = no_match_coverage
+        self.no_match_similarity = no_match_similarity
+        self.no_match_bm25 = no_match_bm25
+        self.can_answer_coverage = can_answer_coverage
+        self.can_answer_similarity = can_answer_similarity
+        self.can_answer_bm25 = can_answer_bm25
+        self._lock = threading.Lock()
+        self._counts = Counter({path: 0 for path in self.PATHS})
+
+    def features(self, question: str, documents: List[Document]) -> Optional[Dict[str, float]]:
+        """Retrieval features of ``documents`` (already the top-k) for ``question``, or None if it has no content terms."""
+        terms = content_terms(question)
+        if not terms:
+            return None
+        covered = [terms & content_terms(doc.page_content) for doc in documents]
+        similarities = [
+            cosine_similarity(doc.metadata["vector_score"]) for doc in documents if "vector_score" in doc.metadata
+        ]
+        return {
+            "coverage": len(set().union(*covered)) / len(terms),
+            "best_coverage": max(len(c) for c in covered) / len(terms),
+            "bm25": max((doc.metadata.get("bm25_score", 0.0) for doc in documents), default=0.0),
+            "similarity": max(similarities) if similarities else None,
+        }
+
+    def classify(self, features: Optional[Dict[str, float]]) -> Optional[str]:
+        """``NO_MATCH`` or ``CAN_ANSWER`` when the features are clear-cut, else None."""
+        if features is None or features["similarity"] is None:
+            return None
+        if (
+            features["coverage"] <= self.no_match_coverage
+            and features["similarity"] < self.no_match_similarity
+            and features["bm25"] < self.no_match_bm25
+        ):
+            return "NO_MATCH"
+        if (
+            features["best_coverage"] >= self.can_answer_coverage
+            and features["similarity"] >= self.can_answer_similarity
+            and features["bm25"] >= self.can_answer_bm25
+        ):
+            return "CAN_ANSWER"
+        return None
+
+    def record(self, path: str) -> None:
+        with self._lock:
+            self._counts[path] += 1
+            counts = dict(self._counts)
+        total = sum(counts.values())
+        shares = ", ".join(f"{name} {count / total:.0%}" for name, count in counts.items())
+        logger.info(f"Relevance check took the {path} path; {total} checks so far: {shares}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
@@ -1,36 +1,20 @@
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from typing import Dict, List
+from typing import AsyncIterator, Dict, Iterator, List
 from langchain.schema import Document
 from config.settings import settings
+from utils.llm_gateway import get_llm
+from utils.tracing import current_span
+from .context_packer import format_context
 import logging
-import os
-import json
-from langchain_core.tools import tool
-from langchain_groq import ChatGroq
-from langchain_mistralai import MistralAIEmbeddings
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-groq_api_key = os.getenv("GROQ_API_KEY")
-mistral_api_key = os.getenv("MISTRAL_API_KEY")
-
 
 logger = logging.getLogger(__name__)
 
 class ResearchAgent:
     def __init__(self):
         """Initialize the research agent with the OpenAI model."""
-        model_id = "qwen/qwen3-32b" # 	qwen/qwen3-32b  openai/gpt-oss-120b llama3-8b-8192 
-    
-        self.llm = ChatGroq(model=model_id,
-            temperature=0,
-            max_tokens=None,
-            timeout=None,
-            max_retries=2,
-            verbose=1)
+        # Model comes from settings (RESEARCH_MODEL, else LLM_MODEL)
+        self.llm = get_llm("research")
         
         self.prompt = ChatPromptTemplate.from_template(
             """Answer the following question based on the provided context. Be precise and factual.
@@ -40,22 +24,26 @@ class ResearchAgent:
             Context:
             {context}
             
+            Each passage in the context starts with a label like [1]. Cite the passages that support each
+            statement using those labels, e.g. "PUE was 1.10 [2]".
+            
             If the context is insufficient, respond with: "I cannot answer this question based on the provided documents."
             """
         )
+        self.chain = self.prompt | self.llm | StrOutputParser()
         
     def generate(self, question: str, documents: List[Document]) -> Dict:
         """Generate an initial answer using the provided documents."""
-        context = "\n\n".join([doc.page_content for doc in documents])
+        context = format_context(documents)
+        current_span().set(documents=len(documents), context_chars=len(context))
         
-        chain = self.prompt | self.llm | StrOutputParser()
         try:
-            answer = chain.invoke({
+            answer = self.chain.invoke({
                 "question": question,
                 "context": context
             })
             logger.info(f"Generated answer: {answer}")
-            logger.info(f"Context used: {context}")
+            logger.debug(f"Context used: {context}")
         except Exception as e:
             logger.error(f"Error generating answer: {e}")
             raise
@@ -63,4 +51,60 @@ class ResearchAgent:
         return {
             "draft_answer": answer,
             "context_used": context
-        }
\ No newline at end of file
+        }
+
+    async def agenerate(self, question: str, documents: List[Document]) -> Dict:
+        """Async variant of ``generate`` using the chain's ``ainvoke``."""
+        context = format_context(documents)
+        current_span().set(documents=len(documents), context_chars=len(context))
+
+        try:
+            answer = await self.chain.ainvoke({
+                "question": question,
+                "context": context
+            })
+            logger.info(f"Generated answer: {answer}")
+        except Exception as e:
+            logger.error(f"Error generating answer: {e}")
+            raise
+
+        return {
+            "draft_answer": answer,
+            "context_used": context
+        }
+
+    def stream(self, question: str, documents: List[Document]) -> Iterator[str]:
+        """Stream the answer token by token using the provided documents."""
+        context = format_context(documents)
+        current_span().set(documents=len(documents), context_chars=len(context))
+
+        try:
+            answer = ""
+            for token in self.chain.stream({
+                "question": question,
+                "context": context
+            }):
+                answer += token
+                yield token
+            logger.info(f"Generated answer: {answer}")
+        except Exception as e:
+            logger.error(f"Error streaming answer: {e}")
+            raise
+
+    async def astream(self, question: str, documents: List[Document]) -> AsyncIterator[str]:
+        """Async variant of ``stream`` using the chain's ``astream``."""
+        context = format_context(documents)
+        current_span().set(documents=len(documents), context_chars=len(context))
+
+        try:
+            answer = ""
+            async for token in self.chain.astream({
+                "question": question,
+                "context": context
+            }):
+                answer += token
+                yield token
+            logger.info(f"Generated answer: {answer}")
+        except Exception as e:
+            logger.error(f"Error streaming answer: {e}")
+            raise
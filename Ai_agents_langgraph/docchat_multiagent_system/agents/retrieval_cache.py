@@ -0,0 +1,47 @@
+import threading
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Tuple
+
+from langchain.schema import Document
+
+
+def retriever_fingerprint(retriever) -> Hashable:
+    """Identify the corpus behind a retriever by its document hashes when available."""
+    metadata = getattr(retriever, "metadata", None) or {}
+    return metadata.get("doc_hashes") or id(retriever)
+
+
+def normalize_question(question: str) -> str:
+    return " ".join(question.split()).casefold()
+
+
+class RetrievalCache:
+    """Bounded LRU cache of retrieval results keyed by (retriever fingerprint, normalized question)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[Hashable, str], List[Document]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, retriever, question: str) -> Optional[List[Document]]:
+        key = (retriever_fingerprint(retriever), normalize_question(question))
+        with self._lock:
+            documents = self._entries.get(key)
+            if documents is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(documents)
+
+    def put(self, retriever, question: str, documents: List[Document]) -> None:
+        if self.max_entries <= 0:
+            return
+        key = (retriever_fingerprint(retriever), normalize_question(question))
+        with self._lock:
+            self._entries[key] = list(documents)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
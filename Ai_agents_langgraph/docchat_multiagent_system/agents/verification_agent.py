@@ -1,32 +1,20 @@
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from typing import Dict, List
 from langchain.schema import Document
 from config.settings import settings
+from utils.llm_gateway import get_llm
+from utils.tracing import current_span
+from .context_packer import format_context
 import logging
-import os
-from dotenv import load_dotenv
-from langchain_groq import ChatGroq
-from langchain_mistralai import MistralAIEmbeddings
-
-load_dotenv()
-
-groq_api_key = os.getenv("GROQ_API_KEY")
-mistral_api_key = os.getenv("MISTRAL_API_KEY")
+import re
 
 logger = logging.getLogger(__name__)
 
 class VerificationAgent:
     def __init__(self):
-        model_id = "qwen/qwen3-32b" # 	qwen/qwen3-32b  openai/gpt-oss-120b llama3-8b-8192 
-    
-        self.llm = ChatGroq(model=model_id,
-            temperature=0,
-            max_tokens=None,
-            timeout=None,
-            max_retries=2,
-            verbose=1)
+        # Model comes from settings (VERIFICATION_MODEL, else LLM_MODEL)
+        self.llm = get_llm("verification")
         
         self.prompt = ChatPromptTemplate.from_template(
             """Verify the following answer against the provided context. Check for:
@@ -45,19 +33,20 @@ class VerificationAgent:
             Context: {context}
             """
         )
+        self.chain = self.prompt | self.llm | StrOutputParser()
         
     def check(self, answer: str, documents: List[Document]) -> Dict:
         """Verify the answer against the provided documents."""
-        context = "\n\n".join([doc.page_content for doc in documents])
+        context = format_context(documents)
+        current_span().set(documents=len(documents), context_chars=len(context))
         
-        chain = self.prompt | self.llm | StrOutputParser()
         try:
-            verification = chain.invoke({
+            verification = self.chain.invoke({
                 "answer": answer,
                 "context": context
             })
             logger.info(f"Verification report: {verification}")
-            logger.info(f"Context used: {context}")
+            logger.debug(f"Context used: {context}")
         except Exception as e:
             logger.error(f"Error verifying answer: {e}")
             raise
@@ -65,4 +54,42 @@ class VerificationAgent:
         return {
             "verification_report": verification,
             "context_used": context
-        }
\ No newline at end of file
+        }
+
+    async def acheck(self, answer: str, documents: List[Document]) -> Dict:
+        """Async variant of ``check`` using the chain's ``ainvoke``."""
+        context = format_context(documents)
+        current_span().set(documents=len(documents), context_chars=len(context))
+
+        try:
+            verification = await self.chain.ainvoke({
+                "answer": answer,
+                "context": context
+            })
+            logger.info(f"Verification report: {verification}")
+        except Exception as e:
+            logger.error(f"Error verifying answer: {e}")
+            raise
+
+        return {
+            "verification_report": verification,
+            "context_used": context
+        }
+
+def extract_unsupported_claims(verification_report: str) -> List[str]:
+    """Pull the items listed under "Unsupported Claims" and "Contradictions" out of a report."""
+    claims = []
+    for label in ("Unsupported Claims", "Contradictions"):
+        match = re.search(
+            rf"{label}:\s*(.*?)(?=\n\s*(?:Supported|Unsupported Claims|Contradictions|Relevant):|\Z)",
+            verification_report,
+            re.DOTALL
+        )
+        if not match:
+            continue
+        body = match.group(1).strip().strip("[]")
+        for item in re.split(r"\n|;|\"\s*,\s*\"", body):
+            item = item.strip().strip("-*•\"' ").strip()
+            if item and item.lower() not in {"none", "n/a", "[]"}:
+                claims.append(item)
+    return claims
@@ -1,11 +1,23 @@
 from langgraph.graph import StateGraph, END
-from typing import TypedDict, List, Dict
+from typing import TypedDict, List, Dict, AsyncIterator, Iterator, Optional
 from .research_agent import ResearchAgent
-from .verification_agent import VerificationAgent
+from .verification_agent import VerificationAgent, extract_unsupported_claims
 from .relevance_checker import RelevanceChecker
+from .retrieval_cache import RetrievalCache, retriever_fingerprint
+from .answer_cache import AnswerCache
+from .context_packer import ContextPacker, cited_documents
 from langchain.schema import Document
 from langchain.retrievers import EnsembleRetriever
+from langchain_core.runnables import RunnableLambda
+from config.settings import settings
+from utils.clients import get_embeddings
+from utils.tracing import current_span, iterate_in_span, tracer
+import asyncio
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from functools import cached_property, wraps
 
 logger = logging.getLogger(__name__)
 
@@ -16,25 +28,75 @@ class AgentState(TypedDict):
     verification_report: str
     is_relevant: bool
     retriever: EnsembleRetriever
+    iteration: int
+    max_iterations: int
+    deadline: float
+    timings: List[Dict]
+    context_documents: List[Document]
 
 class AgentWorkflow:
     def __init__(self):
-        self.researcher = ResearchAgent()
-        self.verifier = VerificationAgent()
-        self.relevance_checker = RelevanceChecker()
+        self.retrieval_cache = RetrievalCache(settings.RETRIEVAL_CACHE_SIZE)
+        self.answer_cache = AnswerCache(
+            embeddings_factory=lambda: get_embeddings(settings.EMBEDDING_MODEL),
+            similarity_threshold=settings.ANSWER_CACHE_SIMILARITY,
+            ttl_seconds=settings.ANSWER_CACHE_TTL,
+            max_entries=settings.ANSWER_CACHE_SIZE
+        )
+        self.context_packer = ContextPacker(
+            token_budget=settings.CONTEXT_TOKEN_BUDGET,
+            dedup_threshold=settings.CONTEXT_DEDUP_THRESHOLD
+        )
+        # Graph nodes wrapped in a tracing span each; shared by the graph and the streaming pipelines
+        self.steps = {
+            "check_relevance": self._traced_step("check_relevance", self._check_relevance_step),
+            "research": self._traced_step("research", self._research_step),
+            "verify": self._traced_step("verify", self._verification_step),
+            "expand_retrieval": self._traced_step("expand_retrieval", self._expand_retrieval_step),
+        }
+        self.async_steps = {
+            "check_relevance": self._traced_astep("check_relevance", self._acheck_relevance_step),
+            "research": self._traced_astep("research", self._aresearch_step),
+            "verify": self._traced_astep("verify", self._averification_step),
+            "expand_retrieval": self._traced_astep("expand_retrieval", self._aexpand_retrieval_step),
+        }
         self.compiled_workflow = self.build_workflow()  # Compile once during initialization
+        # Same graph entered at "verify", for states whose draft was produced speculatively
+        self.speculative_workflow = self.build_workflow(entry_point="verify")
+        self._speculation_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="speculative")
+
+    # Agents (and their chat clients) are created on first use or by warm_up()
+    @cached_property
+    def researcher(self) -> ResearchAgent:
+        return ResearchAgent()
+
+    @cached_property
+    def verifier(self) -> VerificationAgent:
+        return VerificationAgent()
+
+    @cached_property
+    def relevance_checker(self) -> RelevanceChecker:
+        return RelevanceChecker()
+
+    def warm_up(self) -> None:
+        """Create the agents ahead of the first question."""
+        for name in ("relevance_checker", "researcher", "verifier"):
+            getattr(self, name)
         
-    def build_workflow(self):
-        """Create and compile the multi-agent workflow."""
+    def build_workflow(self, entry_point: str = "check_relevance"):
+        """Create and compile the multi-agent workflow.
+
+        Every node has a sync and an async implementation, so the compiled
+        graph serves both ``invoke`` and ``ainvoke``.
+        """
         workflow = StateGraph(AgentState)
         
         # Add nodes
-        workflow.add_node("check_relevance", self._check_relevance_step)
-        workflow.add_node("research", self._research_step)
-        workflow.add_node("verify", self._verification_step)
+        for name, step in self.steps.items():
+            workflow.add_node(name, RunnableLambda(step, afunc=self.async_steps[name], name=name))
         
         # Define edges
-        workflow.set_entry_point("check_relevance")
+        workflow.set_entry_point(entry_point)
         workflow.add_conditional_edges(
             "check_relevance",
             self._decide_after_relevance_check,
@@ -48,20 +110,56 @@ class AgentWorkflow:
             "verify",
             self._decide_next_step,
             {
-                "re_research": "research",
+                "re_research": "expand_retrieval",
                 "end": END
             }
         )
+        workflow.add_edge("expand_retrieval", "research")
         return workflow.compile()
+
+    @staticmethod
+    def _traced_step(name: str, step):
+        @wraps(step)
+        def traced(state: AgentState, parent=None) -> Dict:
+            with tracer.span(f"node.{name}", parent=parent, iteration=state["iteration"]):
+                return step(state)
+        return traced
+
+    @staticmethod
+    def _traced_astep(name: str, step):
+        @wraps(step)
+        async def traced(state: AgentState, parent=None) -> Dict:
+            with tracer.span(f"node.{name}", parent=parent, iteration=state["iteration"]):
+                return await step(state)
+        return traced
     
     def _check_relevance_step(self, state: AgentState) -> Dict:
-        retriever = state["retriever"]
+        # Reuse the documents retrieved once in full_pipeline instead of querying again
+        started = time.monotonic()
         classification = self.relevance_checker.check(
             question=state["question"], 
-            retriever=retriever, 
+            documents=state["documents"], 
+            k=20
+        )
+        return {
+            **self._relevance_update(classification),
+            "timings": self._record_timing(state, 0, "relevance", started)
+        }
+
+    async def _acheck_relevance_step(self, state: AgentState) -> Dict:
+        started = time.monotonic()
+        classification = await self.relevance_checker.acheck(
+            question=state["question"],
+            documents=state["documents"],
             k=20
         )
+        return {
+            **self._relevance_update(classification),
+            "timings": self._record_timing(state, 0, "relevance", started)
+        }
 
+    @staticmethod
+    def _relevance_update(classification: str) -> Dict:
         if classification == "CAN_ANSWER":
             # We have enough info to proceed
             return {"is_relevant": True}
@@ -81,52 +179,714 @@ class AgentWorkflow:
 
     def _decide_after_relevance_check(self, state: AgentState) -> str:
         decision = "relevant" if state["is_relevant"] else "irrelevant"
-        print(f"[DEBUG] _decide_after_relevance_check -> {decision}")
+        logger.debug(f"_decide_after_relevance_check -> {decision}")
         return decision
     
-    def full_pipeline(self, question: str, retriever: EnsembleRetriever):
+    def full_pipeline(
+        self,
+        question: str,
+        retriever: EnsembleRetriever,
+        max_iterations: Optional[int] = None,
+        latency_budget: Optional[float] = None,
+        speculative: Optional[bool] = None
+    ):
+        """Run the workflow for one question.
+
+        ``max_iterations`` caps the number of research passes and
+        ``latency_budget`` (seconds) stops re-research once another pass
+        would overrun it. With ``speculative`` the relevance check and the
+        first research pass run concurrently, and the draft is discarded if
+        the question turns out to be out of scope. All three default to the
+        values in ``settings``. Answers to the same or a paraphrased question
+        on the same corpus are served from the answer cache.
+        """
         try:
-            print(f"[DEBUG] Starting full_pipeline with question='{question}'")
-            documents = retriever.invoke(question)
-            logger.info(f"Retrieved {len(documents)} relevant documents (from .invoke)")
+            with tracer.span("full_pipeline") as root:
+                result = self._run_pipeline(question, retriever, max_iterations, latency_budget, speculative)
+            if root.trace_id:
+                result["trace_id"] = root.trace_id
+                self._log_trace_summary(root.trace_id)
+            return result
+        except Exception as e:
+            logger.error(f"Workflow execution failed: {e}")
+            raise
 
-            initial_state = AgentState(
-                question=question,
-                documents=documents,
-                draft_answer="",
-                verification_report="",
-                is_relevant=False,
-                retriever=retriever
-            )
-            
-            final_state = self.compiled_workflow.invoke(initial_state)
-            
-            return {
-                "draft_answer": final_state["draft_answer"],
-                "verification_report": final_state["verification_report"]
-            }
+    def _run_pipeline(
+        self,
+        question: str,
+        retriever: EnsembleRetriever,
+        max_iterations: Optional[int],
+        latency_budget: Optional[float],
+        speculative: Optional[bool]
+    ) -> Dict:
+        logger.debug(f"Starting full_pipeline with question='{question}'")
+        started = time.monotonic()
+        fingerprint = retriever_fingerprint(retriever)
+        cached, question_vector = self._lookup_answer(fingerprint, question)
+        if cached is not None:
+            return self._cached_answer(cached, started)
+
+        if speculative is None:
+            speculative = settings.SPECULATIVE_RESEARCH
+        initial_state = self._initial_state(question, retriever, max_iterations, latency_budget)
+        config = {"recursion_limit": 3 * initial_state["max_iterations"] + 10}
+
+        if speculative:
+            with tracer.span("speculative_start"):
+                initial_state = self._speculative_start_sync(initial_state)
+            if initial_state["is_relevant"]:
+                final_state = self.speculative_workflow.invoke(initial_state, config=config)
+            else:
+                final_state = initial_state
+        else:
+            final_state = self.compiled_workflow.invoke(initial_state, config=config)
+
+        result = self._final_result(final_state)
+        if self._cacheable(result):
+            self.answer_cache.store(fingerprint, question, result, question_vector)
+        return result
+
+    async def afull_pipeline(
+        self,
+        question: str,
+        retriever: EnsembleRetriever,
+        max_iterations: Optional[int] = None,
+        latency_budget: Optional[float] = None,
+        speculative: Optional[bool] = None
+    ):
+        """Async variant of ``full_pipeline``.
+
+        Retrieval and LLM calls are awaited through ``ainvoke``, so many
+        questions can be in flight on one event loop without a thread each.
+        """
+        try:
+            with tracer.span("full_pipeline", mode="async") as root:
+                result = await self._arun_pipeline(question, retriever, max_iterations, latency_budget, speculative)
+            if root.trace_id:
+                result["trace_id"] = root.trace_id
+                self._log_trace_summary(root.trace_id)
+            return result
         except Exception as e:
             logger.error(f"Workflow execution failed: {e}")
             raise
+
+    async def _arun_pipeline(
+        self,
+        question: str,
+        retriever: EnsembleRetriever,
+        max_iterations: Optional[int],
+        latency_budget: Optional[float],
+        speculative: Optional[bool]
+    ) -> Dict:
+        logger.debug(f"Starting afull_pipeline with question='{question}'")
+        started = time.monotonic()
+        fingerprint = retriever_fingerprint(retriever)
+        cached, question_vector = await self._alookup_answer(fingerprint, question)
+        if cached is not None:
+            return self._cached_answer(cached, started)
+
+        if speculative is None:
+            speculative = settings.SPECULATIVE_RESEARCH
+        initial_state = await self._ainitial_state(question, retriever, max_iterations, latency_budget)
+        config = {"recursion_limit": 3 * initial_state["max_iterations"] + 10}
+
+        if speculative:
+            with tracer.span("speculative_start"):
+                initial_state = await self._speculative_start(initial_state)
+            if initial_state["is_relevant"]:
+                final_state = await self.speculative_workflow.ainvoke(initial_state, config=config)
+            else:
+                final_state = initial_state
+        else:
+            final_state = await self.compiled_workflow.ainvoke(initial_state, config=config)
+
+        result = self._final_result(final_state)
+        if self._cacheable(result):
+            await asyncio.to_thread(self.answer_cache.store, fingerprint, question, result, question_vector)
+        return result
+
+    @staticmethod
+    def _final_result(final_state: AgentState) -> Dict:
+        return {
+            "draft_answer": final_state["draft_answer"],
+            "verification_report": final_state["verification_report"],
+            "timings": final_state["timings"]
+        }
+
+    def _lookup_answer(self, fingerprint, question: str):
+        with tracer.span("answer_cache.lookup") as span:
+            cached, question_vector = self.answer_cache.lookup(fingerprint, question)
+            span.set(cache_hit=cached is not None)
+        return cached, question_vector
+
+    async def _alookup_answer(self, fingerprint, question: str):
+        # A paraphrase lookup embeds the question, which is a blocking call
+        return await asyncio.to_thread(self._lookup_answer, fingerprint, question)
+
+    @staticmethod
+    def _log_trace_summary(trace_id: str) -> None:
+        summary = tracer.summary(trace_id)
+        breakdown = ", ".join(
+            f"{name} {stats['total_ms']:.0f}ms" + (f" x{stats['count']}" if stats["count"] > 1 else "")
+            for name, stats in summary["by_name"].items()
+        )
+        logger.info(f"Trace {trace_id}: {summary['total_ms']:.0f}ms total ({breakdown})")
     
+    def _speculative_start_sync(self, state: AgentState) -> AgentState:
+        """Sync variant of ``_speculative_start``: the first research pass runs on a worker thread.
+
+        Threads rather than ``asyncio.run``, whose fresh event loop per call
+        would strand the pooled async HTTP connections and fails where a
+        loop is already running. A draft for a question found out of scope
+        is abandoned; its LLM call finishes in the background.
+        """
+        started = time.monotonic()
+        state["context_documents"] = self.context_packer.pack(state["documents"])
+        research = self._speculation_pool.submit(
+            copy_context().run, self.researcher.generate, state["question"], state["context_documents"]
+        )
+        try:
+            classification = self.relevance_checker.check(state["question"], state["documents"], k=20)
+        except BaseException:
+            research.cancel()
+            raise
+        state.update(self._relevance_update(classification))
+
+        if not state["is_relevant"]:
+            research.cancel()
+            logger.info("Discarded speculative draft: question classified as NO_MATCH")
+            return state
+
+        result = research.result()
+        state.update(draft_answer=result["draft_answer"], iteration=1)
+        state["timings"] = self._record_timing(state, 1, "research", started)
+        return state
+
+    async def _speculative_start(self, state: AgentState) -> AgentState:
+        """Run the relevance check and the first research pass concurrently."""
+        started = time.monotonic()
+        state["context_documents"] = self.context_packer.pack(state["documents"])
+        research = asyncio.create_task(
+            self.researcher.agenerate(state["question"], state["context_documents"])
+        )
+        try:
+            classification = await self.relevance_checker.acheck(
+                state["question"], state["documents"], k=20
+            )
+        except BaseException:
+            research.cancel()
+            raise
+        state.update(self._relevance_update(classification))
+
+        if not state["is_relevant"]:
+            research.cancel()
+            try:
+                await research
+            except asyncio.CancelledError:
+                pass
+            logger.info("Discarded speculative draft: question classified as NO_MATCH")
+            return state
+
+        result = await research
+        state.update(draft_answer=result["draft_answer"], iteration=1)
+        state["timings"] = self._record_timing(state, 1, "research", started)
+        return state
+
+    def stream_pipeline(
+        self,
+        question: str,
+        retriever: EnsembleRetriever,
+        max_iterations: Optional[int] = None,
+        latency_budget: Optional[float] = None,
+        speculative: Optional[bool] = None
+    ) -> Iterator[Dict]:
+        """Run the workflow for one question, yielding progress as it happens.
+
+        Follows the same steps and routing as the compiled graph, but streams
+        the researcher's tokens. Each yielded dict has a ``stage``
+        ("research", "verify" or "done") plus the ``draft_answer``,
+        ``verification_report`` and ``iteration`` so far. In speculative mode
+        the relevance check runs on a worker thread while the first pass
+        streams; tokens are held back until the question is known to be in
+        scope. Cached answers are yielded as a single "done" event.
+        """
+        # The root span is only current while this generator runs, never in the consumer between events
+        root = tracer.start_span("stream_pipeline")
+        error = None
+        try:
+            yield from iterate_in_span(
+                root, self._stream_events(question, retriever, max_iterations, latency_budget, speculative, root)
+            )
+        except GeneratorExit:
+            raise
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            tracer.finish(root, error)
+            if root.trace_id:
+                self._log_trace_summary(root.trace_id)
+
+    def _stream_events(
+        self,
+        question: str,
+        retriever: EnsembleRetriever,
+        max_iterations: Optional[int],
+        latency_budget: Optional[float],
+        speculative: Optional[bool],
+        root
+    ) -> Iterator[Dict]:
+        logger.debug(f"Starting stream_pipeline with question='{question}'")
+        started = time.monotonic()
+        fingerprint = retriever_fingerprint(retriever)
+        cached, question_vector = self._lookup_answer(fingerprint, question)
+        if cached is not None:
+            yield {"stage": "done", "iteration": 0, "trace_id": root.trace_id, **self._cached_answer(cached, started)}
+            return
+
+        for event in self._stream_steps(question, retriever, max_iterations, latency_budget, speculative, root):
+            if event["stage"] == "done":
+                event["trace_id"] = root.trace_id
+                if self._cacheable(event):
+                    self.answer_cache.store(fingerprint, question, event, question_vector)
+            yield event
+
+    def _stream_steps(
+        self,
+        question: str,
+        retriever: EnsembleRetriever,
+        max_iterations: Optional[int],
+        latency_budget: Optional[float],
+        speculative: Optional[bool],
+        root=None
+    ) -> Iterator[Dict]:
+        try:
+            if speculative is None:
+                speculative = settings.SPECULATIVE_RESEARCH
+            state = self._initial_state(question, retriever, max_iterations, latency_budget)
+            pending_relevance = None
+            if speculative:
+                pending_relevance = self._speculation_pool.submit(
+                    self.steps["check_relevance"], dict(state), parent=root
+                )
+            else:
+                state.update(self.steps["check_relevance"](state))
+                if self._decide_after_relevance_check(state) == "irrelevant":
+                    yield self._stream_event(state, "done")
+                    return
+
+            while True:
+                iteration = state["iteration"] + 1
+                started = time.monotonic()
+                state.update(draft_answer="", verification_report="", iteration=iteration)
+                state["context_documents"] = self.context_packer.pack(state["documents"])
+                research_span = tracer.start_span("node.research", iteration=iteration)
+                tokens = iterate_in_span(
+                    research_span, self.researcher.stream(state["question"], state["context_documents"])
+                )
+                for token in tokens:
+                    state["draft_answer"] += token
+                    if pending_relevance is not None:
+                        if not pending_relevance.done():
+                            continue
+                        state.update(pending_relevance.result())
+                        pending_relevance = None
+                        if self._decide_after_relevance_check(state) == "irrelevant":
+                            tokens.close()
+                            break
+                    yield self._stream_event(state, "research")
+                tracer.finish(research_span)
+                if pending_relevance is not None:
+                    state.update(pending_relevance.result())
+                    pending_relevance = None
+                    if self._decide_after_relevance_check(state) != "irrelevant":
+                        yield self._stream_event(state, "research")
+                if not state["is_relevant"]:
+                    logger.info("Discarded speculative draft: question classified as NO_MATCH")
+                    yield self._stream_event(state, "done")
+                    return
+                state["timings"] = self._record_timing(state, iteration, "research", started)
+
+                yield self._stream_event(state, "verify")
+                state.update(self.steps["verify"](state))
+                if self._decide_next_step(state) == "end":
+                    break
+                yield self._stream_event(state, "verify")
+                state.update(self.steps["expand_retrieval"](state))
+
+            yield self._stream_event(state, "done")
+        except Exception as e:
+            logger.error(f"Streaming workflow execution failed: {e}")
+            raise
+
+    async def astream_pipeline(
+        self,
+        question: str,
+        retriever: EnsembleRetriever,
+        max_iterations: Optional[int] = None,
+        latency_budget: Optional[float] = None,
+        speculative: Optional[bool] = None
+    ) -> AsyncIterator[Dict]:
+        """Async variant of ``stream_pipeline``, yielding the same events.
+
+        The pipeline runs as its own task and hands events over through a
+        one-slot queue, so its tracing context stays out of the consumer and
+        an abandoned stream cancels the remaining work.
+        """
+        events = asyncio.Queue(maxsize=1)
+
+        async def produce():
+            try:
+                with tracer.span("stream_pipeline", mode="async") as root:
+                    async for event in self._astream_events(
+                        question, retriever, max_iterations, latency_budget, speculative, root
+                    ):
+                        await events.put((event, None))
+                if root.trace_id:
+                    self._log_trace_summary(root.trace_id)
+                await events.put((None, None))
+            except Exception as e:
+                await events.put((None, e))
+
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                event, error = await events.get()
+                if error is not None:
+                    raise error
+                if event is None:
+                    return
+                yield event
+        finally:
+            producer.cancel()
+
+    async def _astream_events(
+        self,
+        question: str,
+        retriever: EnsembleRetriever,
+        max_iterations: Optional[int],
+        latency_budget: Optional[float],
+        speculative: Optional[bool],
+        root
+    ) -> AsyncIterator[Dict]:
+        logger.debug(f"Starting astream_pipeline with question='{question}'")
+        started = time.monotonic()
+        fingerprint = retriever_fingerprint(retriever)
+        cached, question_vector = await self._alookup_answer(fingerprint, question)
+        if cached is not None:
+            yield {"stage": "done", "iteration": 0, "trace_id": root.trace_id, **self._cached_answer(cached, started)}
+            return
+
+        async for event in self._astream_steps(question, retriever, max_iterations, latency_budget, speculative):
+            if event["stage"] == "done":
+                event["trace_id"] = root.trace_id
+                if self._cacheable(event):
+                    await asyncio.to_thread(self.answer_cache.store, fingerprint, question, event, question_vector)
+            yield event
+
+    async def _astream_steps(
+        self,
+        question: str,
+        retriever: EnsembleRetriever,
+        max_iterations: Optional[int],
+        latency_budget: Optional[float],
+        speculative: Optional[bool]
+    ) -> AsyncIterator[Dict]:
+        pending_relevance = None
+        try:
+            if speculative is None:
+                speculative = settings.SPECULATIVE_RESEARCH
+            state = await self._ainitial_state(question, retriever, max_iterations, latency_budget)
+            if speculative:
+                pending_relevance = asyncio.create_task(self.async_steps["check_relevance"](dict(state)))
+            else:
+                state.update(await self.async_steps["check_relevance"](state))
+                if self._decide_after_relevance_check(state) == "irrelevant":
+                    yield self._stream_event(state, "done")
+                    return
+
+            while True:
+                iteration = state["iteration"] + 1
+                started = time.monotonic()
+                state.update(draft_answer="", verification_report="", iteration=iteration)
+                state["context_documents"] = self.context_packer.pack(state["documents"])
+                with tracer.span("node.research", iteration=iteration):
+                    tokens = self.researcher.astream(state["question"], state["context_documents"])
+                    async for token in tokens:
+                        state["draft_answer"] += token
+                        if pending_relevance is not None:
+                            if not pending_relevance.done():
+                                continue
+                            state.update(pending_relevance.result())
+                            pending_relevance = None
+                            if self._decide_after_relevance_check(state) == "irrelevant":
+                                await tokens.aclose()
+                                break
+                        yield self._stream_event(state, "research")
+                if pending_relevance is not None:
+                    state.update(await pending_relevance)
+                    pending_relevance = None
+                    if self._decide_after_relevance_check(state) != "irrelevant":
+                        yield self._stream_event(state, "research")
+                if not state["is_relevant"]:
+                    logger.info("Discarded speculative draft: question classified as NO_MATCH")
+                    yield self._stream_event(state, "done")
+                    return
+                state["timings"] = self._record_timing(state, iteration, "research", started)
+
+                yield self._stream_event(state, "verify")
+                state.update(await self.async_steps["verify"](state))
+                if self._decide_next_step(state) == "end":
+                    break
+                yield self._stream_event(state, "verify")
+                state.update(await self.async_steps["expand_retrieval"](state))
+
+            yield self._stream_event(state, "done")
+        except Exception as e:
+            logger.error(f"Streaming workflow execution failed: {e}")
+            raise
+        finally:
+            if pending_relevance is not None:
+                pending_relevance.cancel()
+
+    def _initial_state(
+        self,
+        question: str,
+        retriever: EnsembleRetriever,
+        max_iterations: Optional[int],
+        latency_budget: Optional[float]
+    ) -> AgentState:
+        started = time.monotonic()
+        documents = self._retrieve(question, retriever)
+        return self._new_state(question, retriever, documents, max_iterations, latency_budget, started)
+
+    async def _ainitial_state(
+        self,
+        question: str,
+        retriever: EnsembleRetriever,
+        max_iterations: Optional[int],
+        latency_budget: Optional[float]
+    ) -> AgentState:
+        started = time.monotonic()
+        documents = await self._aretrieve(question, retriever)
+        return self._new_state(question, retriever, documents, max_iterations, latency_budget, started)
+
+    @staticmethod
+    def _new_state(
+        question: str,
+        retriever: EnsembleRetriever,
+        documents: List[Document],
+        max_iterations: Optional[int],
+        latency_budget: Optional[float],
+        started: float
+    ) -> AgentState:
+        if max_iterations is None:
+            max_iterations = settings.MAX_RESEARCH_ITERATIONS
+        if latency_budget is None:
+            latency_budget = settings.RESEARCH_LATENCY_BUDGET
+        return AgentState(
+            question=question,
+            documents=documents,
+            draft_answer="",
+            verification_report="",
+            is_relevant=False,
+            retriever=retriever,
+            iteration=0,
+            max_iterations=max_iterations,
+            deadline=started + latency_budget,
+            timings=[{"iteration": 0, "stage": "retrieval", "seconds": time.monotonic() - started}],
+            context_documents=[]
+        )
+
+    @staticmethod
+    def _cached_answer(cached: Dict, started: float) -> Dict:
+        return {
+            "draft_answer": cached["draft_answer"],
+            "verification_report": cached["verification_report"],
+            "timings": [{"iteration": 0, "stage": "answer_cache", "seconds": time.monotonic() - started}]
+        }
+
+    @staticmethod
+    def _stream_event(state: AgentState, stage: str) -> Dict:
+        return {
+            "stage": stage,
+            "iteration": state["iteration"],
+            "draft_answer": state["draft_answer"],
+            "verification_report": state["verification_report"],
+            "timings": state["timings"]
+        }
+
+    def _retrieve(self, question: str, retriever: EnsembleRetriever) -> List[Document]:
+        """Retrieve documents once per question, reusing results for repeat questions on the same corpus."""
+        with tracer.span("retrieve") as span:
+            documents = self.retrieval_cache.get(retriever, question)
+            if documents is not None:
+                span.set(cache_hit=True, documents=len(documents))
+                logger.info(f"Reused {len(documents)} cached documents for a repeated question")
+                return documents
+
+            documents = retriever.invoke(question)
+            span.set(cache_hit=False, documents=len(documents))
+            logger.info(f"Retrieved {len(documents)} relevant documents (from .invoke)")
+            self.retrieval_cache.put(retriever, question, documents)
+            return documents
+
+    async def _aretrieve(self, question: str, retriever: EnsembleRetriever) -> List[Document]:
+        """Async variant of ``_retrieve`` using the retriever's ``ainvoke``."""
+        with tracer.span("retrieve") as span:
+            documents = self.retrieval_cache.get(retriever, question)
+            if documents is not None:
+                span.set(cache_hit=True, documents=len(documents))
+                logger.info(f"Reused {len(documents)} cached documents for a repeated question")
+                return documents
+
+            documents = await retriever.ainvoke(question)
+            span.set(cache_hit=False, documents=len(documents))
+            logger.info(f"Retrieved {len(documents)} relevant documents (from .ainvoke)")
+            self.retrieval_cache.put(retriever, question, documents)
+            return documents
+
     def _research_step(self, state: AgentState) -> Dict:
-        print(f"[DEBUG] Entered _research_step with question='{state['question']}'")
-        result = self.researcher.generate(state["question"], state["documents"])
-        print("[DEBUG] Researcher returned draft answer.")
-        return {"draft_answer": result["draft_answer"]}
+        iteration = state["iteration"] + 1
+        logger.debug(f"Entered _research_step (iteration {iteration}) with question='{state['question']}'")
+        started = time.monotonic()
+        context_documents = self.context_packer.pack(state["documents"])
+        result = self.researcher.generate(state["question"], context_documents)
+        logger.debug("Researcher returned draft answer.")
+        return {
+            "draft_answer": result["draft_answer"],
+            "context_documents": context_documents,
+            "iteration": iteration,
+            "timings": self._record_timing(state, iteration, "research", started)
+        }
+
+    async def _aresearch_step(self, state: AgentState) -> Dict:
+        iteration = state["iteration"] + 1
+        started = time.monotonic()
+        context_documents = self.context_packer.pack(state["documents"])
+        result = await self.researcher.agenerate(state["question"], context_documents)
+        return {
+            "draft_answer": result["draft_answer"],
+            "context_documents": context_documents,
+            "iteration": iteration,
+            "timings": self._record_timing(state, iteration, "research", started)
+        }
     
     def _verification_step(self, state: AgentState) -> Dict:
-        print("[DEBUG] Entered _verification_step. Verifying the draft answer...")
-        result = self.verifier.check(state["draft_answer"], state["documents"])
-        print("[DEBUG] VerificationAgent returned a verification report.")
-        return {"verification_report": result["verification_report"]}
+        logger.debug("Entered _verification_step. Verifying the draft answer...")
+        started = time.monotonic()
+        result = self.verifier.check(state["draft_answer"], self._evidence(state))
+        logger.debug("VerificationAgent returned a verification report.")
+        return {
+            "verification_report": result["verification_report"],
+            "timings": self._record_timing(state, state["iteration"], "verify", started)
+        }
+
+    async def _averification_step(self, state: AgentState) -> Dict:
+        started = time.monotonic()
+        result = await self.verifier.acheck(state["draft_answer"], self._evidence(state))
+        return {
+            "verification_report": result["verification_report"],
+            "timings": self._record_timing(state, state["iteration"], "verify", started)
+        }
+
+    @staticmethod
+    def _evidence(state: AgentState) -> List[Document]:
+        # Verify against the chunks the draft cites, or everything it was given if it cites none
+        return cited_documents(state["draft_answer"], state["context_documents"]) or state["context_documents"]
+
+    def _expand_retrieval_step(self, state: AgentState) -> Dict:
+        """Re-retrieve for the claims the verifier could not support and fuse them with the current documents."""
+        started = time.monotonic()
+        claims = self._expansion_queries(state)
+        ranked_lists = [state["documents"]]
+        for claim in claims:
+            ranked_lists.append(self._retrieve(claim, state["retriever"]))
+        return self._expanded_documents(state, ranked_lists, started)
+
+    async def _aexpand_retrieval_step(self, state: AgentState) -> Dict:
+        started = time.monotonic()
+        claims = self._expansion_queries(state)
+        ranked_lists = await asyncio.gather(*(self._aretrieve(claim, state["retriever"]) for claim in claims))
+        return self._expanded_documents(state, [state["documents"], *ranked_lists], started)
+
+    @staticmethod
+    def _expansion_queries(state: AgentState) -> List[str]:
+        claims = extract_unsupported_claims(state["verification_report"])
+        logger.debug(f"Entered _expand_retrieval_step with {len(claims)} unsupported claims.")
+        if not claims:
+            # Nothing targeted to search for; widen the question itself instead
+            claims = [f"{state['question']} {state['draft_answer']}"]
+        return claims[:settings.MAX_CLAIM_QUERIES]
+
+    def _expanded_documents(self, state: AgentState, ranked_lists: List[List[Document]], started: float) -> Dict:
+        claims = len(ranked_lists) - 1
+        documents = _reciprocal_rank_fusion(ranked_lists)
+        documents = documents[:len(state["documents"]) + settings.RE_RESEARCH_EXTRA_DOCS]
+        current_span().set(claims=claims, documents=len(documents))
+        logger.info(f"Expanded retrieval from {len(state['documents'])} to {len(documents)} documents")
+        return {
+            "documents": documents,
+            "timings": self._record_timing(state, state["iteration"], "expand_retrieval", started)
+        }
     
     def _decide_next_step(self, state: AgentState) -> str:
         verification_report = state["verification_report"]
-        print(f"[DEBUG] _decide_next_step with verification_report='{verification_report}'")
-        if "Supported: NO" in verification_report or "Relevant: NO" in verification_report:
-            logger.info("[DEBUG] Verification indicates re-research needed.")
-            return "re_research"
-        else:
-            logger.info("[DEBUG] Verification successful, ending workflow.")
+        logger.debug(f"_decide_next_step with verification_report='{verification_report}'")
+        if self._verified(verification_report):
+            logger.debug("Verification successful, ending workflow.")
+            return "end"
+
+        if state["iteration"] >= state["max_iterations"]:
+            logger.info(f"Verification failed but the {state['max_iterations']}-iteration cap was reached, ending workflow.")
             return "end"
+
+        # Stop if another pass as long as the last one would overrun the latency budget
+        last_pass = sum(t["seconds"] for t in state["timings"] if t["iteration"] == state["iteration"])
+        if time.monotonic() + last_pass > state["deadline"]:
+            logger.info("Verification failed but the latency budget is exhausted, ending workflow.")
+            return "end"
+
+        logger.debug("Verification indicates re-research needed.")
+        return "re_research"
+
+    @staticmethod
+    def _verified(verification_report: str) -> bool:
+        return "Supported: NO" not in verification_report and "Relevant: NO" not in verification_report
+
+    @classmethod
+    def _cacheable(cls, result: Dict) -> bool:
+        # Only verified answers; a refusal or a draft still failing at the iteration cap is not reused
+        report = result["verification_report"]
+        return bool(report) and cls._verified(report)
+
+    @staticmethod
+    def _record_timing(state: AgentState, iteration: int, stage: str, started: float) -> List[Dict]:
+        seconds = time.monotonic() - started
+        logger.info(f"Iteration {iteration} {stage} took {seconds:.2f}s")
+        return state["timings"] + [{"iteration": iteration, "stage": stage, "seconds": seconds}]
+
+
+def _reciprocal_rank_fusion(ranked_lists: List[List[Document]], c: int = 60) -> List[Document]:
+    """Merge ranked document lists by reciprocal rank, deduplicating on page content.
+
+    Returns copies whose ``ensemble_score`` is the fused score, so the
+    context packer ranks them in fused order. Rerank scores are dropped:
+    they were computed against different queries and no longer compare.
+    """
+    scores: Dict[str, float] = {}
+    by_content: Dict[str, Document] = {}
+    for documents in ranked_lists:
+        for rank, doc in enumerate(documents, start=1):
+            scores[doc.page_content] = scores.get(doc.page_content, 0.0) + 1.0 / (rank + c)
+            by_content.setdefault(doc.page_content, doc)
+    return [
+        Document(
+            page_content=content,
+            metadata={
+                **{k: v for k, v in by_content[content].metadata.items() if k != "rerank_score"},
+                "ensemble_score": scores[content]
+            }
+        )
+        for content in sorted(scores, key=scores.get, reverse=True)
+    ]
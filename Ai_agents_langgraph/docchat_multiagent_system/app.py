@@ -1,21 +1,20 @@
 #%%
 import gradio as gr
-import hashlib
 from typing import List, Dict
+import asyncio
 import os
 
 from document_processor.file_handler import DocumentProcessor
 from retriever.builder import RetrieverBuilder
+from retriever.registry import RetrieverRegistry
 from agents.workflow import AgentWorkflow
-from config import constants, settings
+from config import constants
+from config.settings import settings
+from utils.clients import load_environment, warm_up
+from utils.hashing import file_path, hash_file
 from utils.logging import logger
-from dotenv import load_dotenv
-from langchain_mistralai import MistralAIEmbeddings
 
-load_dotenv()
-
-groq_api_key = os.getenv("GROQ_API_KEY")
-mistral_api_key = os.getenv("MISTRAL_API_KEY")
+load_environment()
 
 #%%
 # 1) Define some example data 
@@ -34,7 +33,10 @@ EXAMPLES = {
 def main():
     processor = DocumentProcessor()
     retriever_builder = RetrieverBuilder()
+    retriever_registry = RetrieverRegistry(retriever_builder, settings.RETRIEVER_REGISTRY_MAX_BYTES)
     workflow = AgentWorkflow()
+    # Models, indexes and Docling load in the background while the UI starts
+    warm_up(workflow.warm_up, retriever_builder.warm_up, processor.warm_up)
 
     # Define custom CSS for styling
     css = """
@@ -97,11 +99,12 @@ def main():
         gr.Markdown("Or you can select one of the examples from the drop-down menu, select Load Example then hit Submit 📝", elem_classes="text")
         gr.Markdown("⚠️ **Note:** DocChat only accepts documents in these formats: '.pdf', '.docx', '.txt', '.md'", elem_classes="text")
 
-        # 2) Maintain the session state for retrieving doc changes
+        # 2) Maintain the session state for retrieving doc changes.
+        #    Sessions hold a handle to a shared retriever, released when the session closes.
         session_state = gr.State({
             "file_hashes": frozenset(),
-            "retriever": None
-        })
+            "handle": None
+        }, delete_callback=_release_session)
 
         # 3) Layout 
         with gr.Row():
@@ -159,36 +162,56 @@ def main():
         )
 
         # 5) Standard flow for question submission
-        def process_question(question_text: str, uploaded_files: List, state: Dict):
-            """Handle questions with document caching."""
+        async def process_question(question_text: str, uploaded_files: List, state: Dict):
+            """Handle questions with document caching, streaming the answer as it is generated.
+
+            Runs on the event loop: document processing happens on a worker
+            thread and the workflow awaits its LLM and retriever calls, so
+            concurrent users do not each hold a thread.
+            """
             try:
                 if not question_text.strip():
                     raise ValueError("❌ Question cannot be empty")
                 if not uploaded_files:
                     raise ValueError("❌ No documents uploaded")
 
-                current_hashes = _get_file_hashes(uploaded_files)
+                current_hashes = await asyncio.to_thread(_get_file_hashes, uploaded_files)
                 
-                if state["retriever"] is None or current_hashes != state["file_hashes"]:
+                if state["handle"] is None or current_hashes != state["file_hashes"]:
                     logger.info("Processing new/changed documents...")
-                    chunks = processor.process(uploaded_files)
-                    retriever = retriever_builder.build_hybrid_retriever(chunks)
+                    handle = await asyncio.to_thread(
+                        retriever_registry.acquire,
+                        current_hashes,
+                        lambda: processor.iter_documents(uploaded_files)
+                    )
+                    if state["handle"] is not None:
+                        state["handle"].release()
                     
                     state.update({
                         "file_hashes": current_hashes,
-                        "retriever": retriever
+                        "handle": handle
                     })
+                    logger.info(f"Retriever registry: {retriever_registry.stats()}")
                 
-                result = workflow.full_pipeline(
+                # Stream the draft into the answer box; verification fills its own panel afterwards
+                async for event in workflow.astream_pipeline(
                     question=question_text,
-                    retriever=state["retriever"]
-                )
-                
-                return result["draft_answer"], result["verification_report"], state
+                    retriever=state["handle"].retriever
+                ):
+                    if event["stage"] == "research":
+                        yield event["draft_answer"], "", state
+                    elif event["stage"] == "verify":
+                        if event["verification_report"]:
+                            status = f"🔁 Verification failed, re-researching (pass {event['iteration'] + 1})..."
+                        else:
+                            status = "⏳ Verifying the answer..."
+                        yield event["draft_answer"], status, state
+                    else:
+                        yield event["draft_answer"], event["verification_report"], state
                     
             except Exception as e:
                 logger.error(f"Processing error: {str(e)}")
-                return f"❌ Error: {str(e)}", "", state
+                yield f"❌ Error: {str(e)}", "", state
 
         submit_btn.click(
             fn=process_question,
@@ -196,15 +219,17 @@ def main():
             outputs=[answer_output, verification_output, session_state]
         )
 
+    demo.queue(default_concurrency_limit=settings.APP_CONCURRENCY_LIMIT)
     demo.launch(server_port=7860, server_name="0.0.0.0")
 
+def _release_session(state: Dict) -> None:
+    """Give a closed session's retriever back to the registry."""
+    if state and state.get("handle") is not None:
+        state["handle"].release()
+
 def _get_file_hashes(uploaded_files: List) -> frozenset:
-    """Generate SHA-256 hashes for uploaded files."""
-    hashes = set()
-    for file in uploaded_files:
-        with open(file.name, "rb") as f:
-            hashes.add(hashlib.sha256(f.read()).hexdigest())
-    return frozenset(hashes)
+    """Generate SHA-256 hashes for uploaded files (memoized while a file is unchanged)."""
+    return frozenset(hash_file(file_path(file)) for file in uploaded_files)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,248 @@
+"""End-to-end DocChat benchmark with a per-stage latency breakdown.
+
+Generates a synthetic Markdown corpus, then drives DocumentProcessor,
+RetrieverBuilder and AgentWorkflow with the local stand-in models
+(LLM_BACKEND=fake, EMBEDDING_BACKEND=hashing), so results measure this
+code rather than the network. All stores live in a temporary directory.
+
+Run from the docchat_multiagent_system directory:
+
+    python -m benchmarks.run_benchmark --docs 20 --questions 10 --output bench.json
+    python -m benchmarks.run_benchmark --compare bench.json
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List
+
+_SYLLABLES = ["ka", "lo", "mi", "ra", "ten", "vo", "shi", "pe", "dor", "lun", "ex", "qua", "ber", "sol", "nim"]
+
+
+class StageTimer:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+
+    @contextmanager
+    def measure(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples[stage].append(time.perf_counter() - started)
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.samples[stage].append(seconds)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {
+            stage: {
+                "count": len(values),
+                "p50": percentile(values, 0.50),
+                "p95": percentile(values, 0.95),
+                "mean": sum(values) / len(values),
+                "total": sum(values),
+            }
+            for stage, values in self.samples.items()
+        }
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def make_corpus(directory: Path, docs: int, sections: int, words: int, seed: int):
+    """Write ``docs`` Markdown files and return (paths, questions drawn from their text)."""
+    rng = random.Random(seed)
+    vocabulary = [
+        "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(1, 3))) for _ in range(2000)
+    ]
+    directory.mkdir(parents=True, exist_ok=True)
+    paths, phrases = [], []
+    for d in range(docs):
+        lines = [f"# Report {d}"]
+        for s in range(sections):
+            lines.append(f"## Section {d}.{s}")
+            body = [rng.choice(vocabulary) for _ in range(words)]
+            body[rng.randrange(words)] = f"{rng.randint(1, 999)}.{rng.randint(0, 99)}%"
+            lines.append(" ".join(body))
+            phrases.append(" ".join(body[:4]))
+        path = directory / f"report_{d}.md"
+        path.write_text("\n\n".join(lines), encoding="utf-8")
+        paths.append(str(path))
+    return paths, phrases
+
+
+def configure_environment(workdir: Path, args) -> None:
+    """Point settings at stand-in models and throwaway stores; must run before ``config.settings`` is imported."""
+    os.environ.update({
+        "LLM_BACKEND": "fake",
+        "EMBEDDING_BACKEND": "hashing",
+        "FAKE_LLM_LATENCY": str(args.llm_latency),
+        "FAKE_LLM_TOKENS_PER_SECOND": str(args.tokens_per_second),
+        "LLM_REQUESTS_PER_MINUTE": "0",
+        "CHROMA_DB_PATH": str(workdir / "chroma_db"),
+        "BM25_INDEX_PATH": str(workdir / "chroma_db" / "bm25"),
+        "EMBEDDING_CACHE_PATH": str(workdir / "embedding_cache" / "embeddings.sqlite3"),
+        "CACHE_DIR": str(workdir / "document_cache"),
+        "CONVERSION_WORKERS": str(args.workers),
+        "TRACE_PATH": str(workdir / "traces" / "spans.jsonl"),
+        # Measure every stage on every question rather than cache hits
+        "ANSWER_CACHE_SIZE": "0",
+        "RETRIEVAL_CACHE_SIZE": "0",
+        "SPECULATIVE_RESEARCH": "false",
+        "RERANKER": args.reranker,
+    })
+
+
+def run(args, workdir: Path) -> Dict:
+    # Imported here so the settings module sees the environment set up above
+    from docling.document_converter import DocumentConverter
+    from langchain_community.vectorstores import Chroma
+    from langchain_text_splitters import MarkdownHeaderTextSplitter
+
+    from agents.workflow import AgentWorkflow
+    from config.settings import settings
+    from document_processor.file_handler import HEADERS, DocumentProcessor
+    from retriever.bm25_index import BM25Index
+    from retriever.builder import RetrieverBuilder
+    from retriever.index_manager import group_by_document
+    from utils.clients import get_embeddings
+    from utils.hashing import hash_file
+
+    timer = StageTimer()
+    processor = DocumentProcessor()
+    builder = RetrieverBuilder()
+    workflow = AgentWorkflow()
+    converter = DocumentConverter()
+    splitter = MarkdownHeaderTextSplitter(HEADERS)
+    chunk_counts = []
+
+    for r in range(args.runs):
+        paths, phrases = make_corpus(workdir / f"corpus_{r}", args.docs, args.sections, args.words, args.seed + r)
+        questions = [f"What does the report say about {p}?" for p in random.Random(r).sample(phrases, args.questions)]
+
+        for path in paths:
+            with timer.measure("hashing"):
+                hash_file(path)
+            with timer.measure("conversion"):
+                markdown = converter.convert(path).document.export_to_markdown()
+            with timer.measure("splitting"):
+                splitter.split_text(markdown)
+
+        with timer.measure("document_processing"):
+            chunks = processor.process(paths)
+        chunk_counts.append(len(chunks))
+        texts = [chunk.page_content for chunk in chunks]
+
+        with timer.measure("embedding"):
+            get_embeddings(settings.EMBEDDING_MODEL).embed_documents(texts)
+
+        with timer.measure("bm25_build"):
+            index = BM25Index()
+            for doc_hash, doc_chunks in group_by_document(chunks).items():
+                index.add_document(doc_hash, doc_chunks)
+
+        with timer.measure("chroma_build"):
+            Chroma(
+                collection_name=f"bench_{r}",
+                embedding_function=get_embeddings(settings.EMBEDDING_MODEL),
+                persist_directory=str(workdir / "scratch_chroma")
+            ).add_documents(chunks)
+
+        with timer.measure("retriever_build"):
+            retriever = builder.build_hybrid_retriever(chunks)
+
+        for question in questions:
+            with timer.measure("retrieval"):
+                retriever.invoke(question)
+
+        for question in questions:
+            with timer.measure("pipeline_total"):
+                result = workflow.full_pipeline(question=question, retriever=retriever)
+            for timing in result["timings"]:
+                timer.add(f"workflow.{timing['stage']}", timing["seconds"])
+
+    return {
+        "commit": _git_commit(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "chunks_per_run": chunk_counts,
+        "stages": timer.summary(),
+        "peak_rss_mb": _peak_rss_mb(resource.RUSAGE_SELF),
+        "peak_rss_children_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN),
+    }
+
+
+def _peak_rss_mb(who) -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(who).ru_maxrss / scale
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_report(report: Dict, baseline: Dict = None) -> None:
+    print(f"commit {report['commit']}  peak RSS {report['peak_rss_mb']:.0f} MB "
+          f"(conversion workers {report['peak_rss_children_mb']:.0f} MB)")
+    header = f"{'stage':<28}{'n':>6}{'p50 ms':>12}{'p95 ms':>12}"
+    if baseline:
+        header += f"{'p50 vs base':>14}"
+    print(header)
+    for stage, stats in sorted(report["stages"].items()):
+        line = f"{stage:<28}{stats['count']:>6}{stats['p50'] * 1000:>12.1f}{stats['p95'] * 1000:>12.1f}"
+        base = (baseline or {}).get("stages", {}).get(stage)
+        if base and base["p50"]:
+            line += f"{stats['p50'] / base['p50']:>13.2f}x"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=10, help="documents per run")
+    parser.add_argument("--sections", type=int, default=20, help="sections per document")
+    parser.add_argument("--words", type=int, default=120, help="words per section")
+    parser.add_argument("--questions", type=int, default=5, help="questions per run")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=2, help="document conversion workers")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="stand-in LLM first-token latency (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=500.0, help="stand-in LLM token rate")
+    parser.add_argument("--reranker", default="none", choices=["none", "lexical", "cross_encoder"],
+                        help="re-ranking stage applied to the hybrid candidates")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the report as JSON to this path")
+    parser.add_argument("--compare", help="baseline JSON report to compare p50s against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="docchat-bench-") as tmp:
+        workdir = Path(tmp)
+        configure_environment(workdir, args)
+        report = run(args, workdir)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
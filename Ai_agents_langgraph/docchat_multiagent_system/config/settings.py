@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings
 from .constants import MAX_FILE_SIZE, MAX_TOTAL_SIZE, ALLOWED_TYPES
 import os
+from typing import Optional
 
 class Settings(BaseSettings):
     # Required settings
@@ -15,16 +16,91 @@ class Settings(BaseSettings):
     CHROMA_DB_PATH: str = "./chroma_db"
     CHROMA_COLLECTION_NAME: str = "documents"
 
+    # Embedding settings
+    # Use a separate CHROMA_DB_PATH with a stand-in backend; vector sizes differ between backends
+    EMBEDDING_BACKEND: str = "mistral"
+    EMBEDDING_MODEL: str = "mistral-embed"
+    HASHING_EMBEDDING_DIM: int = 384
+    EMBEDDING_CACHE_PATH: str = "./embedding_cache/embeddings.sqlite3"
+    EMBEDDING_MAX_BATCH_TOKENS: int = 8000
+    EMBEDDING_MAX_BATCH_SIZE: int = 128
+    EMBEDDING_MAX_CONCURRENCY: int = 4
+    EMBEDDING_REQUESTS_PER_MINUTE: float = 0.0  # 0 for no pacing beyond the concurrency cap
+
     # Retrieval settings
     VECTOR_SEARCH_K: int = 10
+    BM25_SEARCH_K: int = 4
+    BM25_INDEX_PATH: str = "./chroma_db/bm25"
     HYBRID_RETRIEVER_WEIGHTS: list = [0.4, 0.6]
+    RETRIEVAL_CACHE_SIZE: int = 128
+    RETRIEVER_REGISTRY_MAX_BYTES: int = 512 * 1024 * 1024  # estimated memory of cached retrievers: text, vectors, BM25 postings
+    # Re-ranking of the hybrid candidates: "none", "lexical" or "cross_encoder" (sentence-transformers, CPU)
+    RERANKER: str = "none"
+    RERANKER_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    RERANK_TOP_N: int = 6
+    RERANK_BATCH_SIZE: int = 32
+
+    # Answer cache settings
+    ANSWER_CACHE_SIZE: int = 256
+    ANSWER_CACHE_TTL: float = 24 * 3600
+    ANSWER_CACHE_SIMILARITY: float = 0.95
+
+    # LLM settings ("fake" / "hashing" select the local stand-in backends)
+    LLM_BACKEND: str = "groq"
+    LLM_MODEL: str = "qwen/qwen3-32b"
+    RESEARCH_MODEL: Optional[str] = None
+    VERIFICATION_MODEL: Optional[str] = None
+    RELEVANCE_MODEL: Optional[str] = None
+    LLM_MAX_CONCURRENCY: int = 4
+    LLM_REQUESTS_PER_MINUTE: float = 30.0
+    LLM_MAX_RETRIES: int = 3
+    LLM_HTTP_MAX_CONNECTIONS: int = 20
+    FAKE_LLM_LATENCY: float = 0.2
+    FAKE_LLM_TOKENS_PER_SECOND: float = 50.0
+
+    # Workflow settings
+    MAX_RESEARCH_ITERATIONS: int = 3
+    RESEARCH_LATENCY_BUDGET: float = 90.0
+    MAX_CLAIM_QUERIES: int = 3
+    RE_RESEARCH_EXTRA_DOCS: int = 5
+    SPECULATIVE_RESEARCH: bool = False
+    CONTEXT_TOKEN_BUDGET: int = 6000
+    CONTEXT_DEDUP_THRESHOLD: float = 0.8
+
+    # Relevance fast path: clear-cut checks are classified from retrieval scores, the rest by the LLM.
+    # Coverage is the share of question terms in the chunks, similarity the best cosine similarity.
+    # Off by default: the thresholds below are starting points, not calibrated values. To calibrate,
+    # run with LOG_LEVEL=DEBUG and collect the "LLM classified ... for retrieval features ..." lines
+    # (logged whether or not the fast path is on), then tighten each threshold until no logged
+    # question on the shortcut's side of it got a different label from the LLM.
+    RELEVANCE_FAST_PATH: bool = False
+    RELEVANCE_NO_MATCH_COVERAGE: float = 0.2
+    RELEVANCE_NO_MATCH_SIMILARITY: float = 0.3
+    RELEVANCE_NO_MATCH_BM25: float = 1.0
+    RELEVANCE_CAN_ANSWER_COVERAGE: float = 0.8
+    RELEVANCE_CAN_ANSWER_SIMILARITY: float = 0.8
+    RELEVANCE_CAN_ANSWER_BM25: float = 8.0
 
     # Logging settings
     LOG_LEVEL: str = "INFO"
 
+    # Tracing settings (spans are appended as JSON lines to TRACE_PATH)
+    TRACING_ENABLED: bool = True
+    TRACE_PATH: str = "./traces/spans.jsonl"
+
     # New cache settings with type annotations
     CACHE_DIR: str = "document_cache"
     CACHE_EXPIRE_DAYS: int = 7
+    CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024  # chunk entries and the page cache together
+    PAGE_CACHE_MAX_ENTRIES: int = 50000  # converted PDF pages and split sections; 0 disables
+
+    # App settings (questions the Gradio queue serves at once across all users)
+    APP_CONCURRENCY_LIMIT: int = 32
+
+    # Document conversion settings
+    CONVERSION_WORKERS: int = min(4, os.cpu_count() or 1)
+    INGEST_QUEUE_SIZE: int = 2  # documents converted ahead of the one being indexed
+    INDEX_BATCH_SIZE: int = 256  # chunks per embedding and insertion batch
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,193 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from utils.logging import logger
+
+INDEX_FILE = "index.json"
+CACHE_SUFFIX = ".chunks"
+# Seconds between index writes caused only by lookups
+INDEX_SAVE_INTERVAL = 30.0
+
+
+class CacheManager:
+    """Size-bounded LRU bookkeeping for the document cache directory.
+
+    A small JSON index next to the entries records each entry's size,
+    creation time and last access. Entries older than ``expire_days`` are
+    treated as misses and removed; whenever the directory grows past
+    ``max_bytes`` the least recently used entries are deleted. Files of
+    other stores in the directory, named in ``shared_files`` (with their
+    SQLite ``-wal`` and ``-shm`` companions), count against ``max_bytes``
+    but are never deleted here.
+
+    Last-access times from lookups are written at most every
+    ``INDEX_SAVE_INTERVAL`` seconds; ``flush()`` writes them at once.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int, expire_days: float, shared_files: Sequence[str] = ()):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.cache_dir / INDEX_FILE
+        self.max_bytes = max_bytes
+        self.max_age = expire_days * 24 * 3600
+        self.shared_files = list(shared_files)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._saved_at = 0.0
+        self._entries: Dict[str, Dict[str, float]] = self._load_index()
+        self._reconcile()
+        self._enforce_limit()
+
+    def lookup(self, name: str) -> Optional[Path]:
+        """Return the path of a fresh entry and mark it used, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(name)
+            path = self.cache_dir / name
+            if entry is not None and time.time() - entry["created"] >= self.max_age:
+                logger.info(f"Cache entry expired: {name}")
+                self._remove(name)
+                entry = None
+            if entry is None or not path.exists():
+                self._entries.pop(name, None)
+                self.misses += 1
+                return None
+
+            entry["last_access"] = time.time()
+            self.hits += 1
+            self._dirty = True
+            if time.monotonic() - self._saved_at >= INDEX_SAVE_INTERVAL:
+                self._save_index()
+            return path
+
+    def flush(self) -> None:
+        """Write last-access times recorded by lookups since the last index write."""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def record(self, name: str) -> None:
+        """Register an entry that was just written, then evict down to the size limit."""
+        with self._lock:
+            path = self.cache_dir / name
+            now = time.time()
+            self._entries[name] = {"size": path.stat().st_size, "created": now, "last_access": now}
+            self._enforce_limit()
+            self._save_index()
+
+    def discard(self, name: str) -> None:
+        """Delete an entry, e.g. one that turned out to be unreadable."""
+        with self._lock:
+            self._remove(name)
+            self._save_index()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.total_bytes(),
+                "shared_bytes": self.shared_bytes(),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def entries(self) -> List[Dict]:
+        """Entries with their size and timestamps, least recently used first."""
+        with self._lock:
+            return [
+                {"name": name, **entry}
+                for name, entry in sorted(self._entries.items(), key=lambda item: item[1]["last_access"])
+            ]
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return int(sum(entry["size"] for entry in self._entries.values()))
+
+    def shared_bytes(self) -> int:
+        """Bytes on disk of the ``shared_files`` stores."""
+        total = 0
+        for name in self.shared_files:
+            for suffix in ("", "-wal", "-shm"):
+                try:
+                    total += (self.cache_dir / f"{name}{suffix}").stat().st_size
+                except FileNotFoundError:
+                    pass
+        return total
+
+    def prune(self, max_bytes: Optional[int] = None, older_than_days: Optional[float] = None) -> int:
+        """Evict unused entries older than ``older_than_days`` and/or down to ``max_bytes``.
+
+        Returns the number of entries removed.
+        """
+        with self._lock:
+            before = self.evictions
+            if older_than_days is not None:
+                cutoff = time.time() - older_than_days * 24 * 3600
+                for name, entry in list(self._entries.items()):
+                    if entry["last_access"] < cutoff:
+                        self._evict(name)
+            self._enforce_limit(self.max_bytes if max_bytes is None else max_bytes)
+            self._save_index()
+            return self.evictions - before
+
+    def _enforce_limit(self, max_bytes: Optional[int] = None) -> None:
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        shared = self.shared_bytes()
+        if shared > limit:
+            logger.warning(f"Shared cache files take {shared} bytes, more than the {limit} byte cache limit")
+        limit -= shared
+        total = self.total_bytes()
+        if total <= limit:
+            return
+        for entry in self.entries():
+            if total <= limit:
+                break
+            total -= entry["size"]
+            self._evict(entry["name"])
+
+    def _evict(self, name: str) -> None:
+        logger.info(f"Evicting cache entry: {name}")
+        self._remove(name)
+        self.evictions += 1
+
+    def _remove(self, name: str) -> None:
+        self._entries.pop(name, None)
+        try:
+            (self.cache_dir / name).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _reconcile(self) -> None:
+        """Adopt entries missing from the index and forget ones whose files are gone."""
+        on_disk = {path.name: path for path in self.cache_dir.glob(f"*{CACHE_SUFFIX}")}
+        for name in list(self._entries):
+            if name not in on_disk:
+                del self._entries[name]
+        for name, path in on_disk.items():
+            if name not in self._entries:
+                stat = path.stat()
+                self._entries[name] = {"size": stat.st_size, "created": stat.st_mtime, "last_access": stat.st_mtime}
+        self._save_index()
+
+    def _load_index(self) -> Dict[str, Dict[str, float]]:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self) -> None:
+        tmp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.index_path)
+        self._dirty = False
+        self._saved_at = time.monotonic()
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from importlib import metadata
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+from langchain.schema import Document
+
+# File layout (little endian):
+#   magic (4 bytes) | format version (uint32) | header length (uint64)
+#   JSON header (chunk count, metadata per chunk, creation time)
+#   offsets: uint64[count + 1] into the text blob
+#   text blob: every chunk's UTF-8 text, concatenated
+MAGIC = b"DCCS"
+FORMAT_VERSION = 1
+_PREFIX = struct.Struct("<4sIQ")
+
+
+def pipeline_version(headers: Sequence) -> str:
+    """Short digest of everything that shapes the stored chunks.
+
+    It is part of each cache key, so changing the store format, the Docling
+    version or the splitter configuration invalidates old entries.
+    """
+    try:
+        docling_version = metadata.version("docling")
+    except metadata.PackageNotFoundError:
+        docling_version = "unknown"
+    fingerprint = json.dumps({
+        "format": FORMAT_VERSION,
+        "docling": docling_version,
+        "splitter": "MarkdownHeaderTextSplitter",
+        "headers": [list(h) for h in headers],
+    }, sort_keys=True)
+    return hashlib.sha256(fingerprint.encode()).hexdigest()[:12]
+
+
+def save_chunks(path: Path, chunks: List[Document], created: float) -> None:
+    """Write chunks to ``path`` atomically in the columnar layout above."""
+    texts = [chunk.page_content.encode("utf-8") for chunk in chunks]
+    offsets = array("Q", [0])
+    for text in texts:
+        offsets.append(offsets[-1] + len(text))
+    if sys.byteorder == "big":
+        offsets.byteswap()
+    header = json.dumps({
+        "count": len(chunks),
+        "created": created,
+        "metadata": [chunk.metadata for chunk in chunks],
+    }, default=str).encode("utf-8")
+
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header)))
+        f.write(header)
+        f.write(offsets.tobytes())
+        for text in texts:
+            f.write(text)
+    os.replace(tmp_path, path)
+
+
+def load_chunks(path: Path, start: int = 0, stop: Optional[int] = None) -> List[Document]:
+    """Read chunks ``start:stop`` from a store file, mapping it rather than reading it whole.
+
+    Raises ``ValueError`` if the file is not a store of the current format.
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if len(mm) < _PREFIX.size:
+            raise ValueError(f"Truncated chunk store: {path}")
+        magic, version, header_len = _PREFIX.unpack_from(mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported chunk store format in {path}")
+
+        header_end = _PREFIX.size + header_len
+        header = json.loads(mm[_PREFIX.size:header_end])
+        count = header["count"]
+        blob_start = header_end + 8 * (count + 1)
+        offsets = array("Q")
+        offsets.frombytes(mm[header_end:blob_start])
+        if sys.byteorder == "big":
+            offsets.byteswap()
+
+        start, stop, _ = slice(start, stop).indices(count)
+        return [
+            Document(
+                page_content=mm[blob_start + offsets[i]:blob_start + offsets[i + 1]].decode("utf-8"),
+                metadata=header["metadata"][i]
+            )
+            for i in range(start, stop)
+        ]
@@ -1,92 +1,311 @@
 import os
 import hashlib
-import pickle
-from datetime import datetime, timedelta
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 from pathlib import Path
-from typing import List
-from docling.document_converter import DocumentConverter
+from typing import Dict, Iterator, List, Optional, Tuple
 from langchain_text_splitters import MarkdownHeaderTextSplitter
 from config import constants
 from config.settings import settings
+from document_processor.cache_manager import CACHE_SUFFIX, CacheManager
+from document_processor.chunk_store import load_chunks, pipeline_version, save_chunks
+from document_processor.page_cache import PAGE_CACHE_FILE, PageCache, convert_pages, pdf_page_hashes, split_pages
+from utils.hashing import file_path, hash_file
 from utils.logging import logger
 
+HEADERS = [("#", "Header 1"), ("##", "Header 2")]
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.txt', '.md')
+
+# One converter per conversion worker process, created by _init_worker
+_worker_converter = None
+
+
+def _new_converter():
+    # Docling is imported on first use; it is slow to import and only needed for conversion
+    from docling.document_converter import DocumentConverter
+    return DocumentConverter()
+
+
+def _init_worker():
+    """Warm up a DocumentConverter once per worker process."""
+    global _worker_converter
+    _worker_converter = _new_converter()
+
+
+def _convert_in_worker(path: str, headers: List) -> List:
+    return convert_and_split(_worker_converter, path, headers)
+
+
+def _convert_pages_in_worker(path: str, pages: Optional[List[int]]) -> Dict[int, str]:
+    return convert_pages(_worker_converter, path, pages)
+
+
+def convert_and_split(converter, path: str, headers: List) -> List:
+    """Convert one file to Markdown with Docling and split it on headers."""
+    if not path.endswith(SUPPORTED_EXTENSIONS):
+        logger.warning(f"Skipping unsupported file type: {path}")
+        return []
+
+    markdown = converter.convert(path).document.export_to_markdown()
+    splitter = MarkdownHeaderTextSplitter(headers)
+    return splitter.split_text(markdown)
+
+
 class DocumentProcessor:
     def __init__(self):
-        self.headers = [("#", "Header 1"), ("##", "Header 2")]
+        self.headers = HEADERS
         self.cache_dir = Path(settings.CACHE_DIR)
-        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.cache = CacheManager(
+            self.cache_dir, settings.CACHE_MAX_BYTES, settings.CACHE_EXPIRE_DAYS, shared_files=[PAGE_CACHE_FILE]
+        )
+        self.cache_version = pipeline_version(self.headers)
+        # Per-page reuse for PDFs whose whole-file entry missed, e.g. a revised report
+        self.page_cache = (
+            PageCache(str(self.cache_dir / PAGE_CACHE_FILE), settings.PAGE_CACHE_MAX_ENTRIES)
+            if settings.PAGE_CACHE_MAX_ENTRIES > 0 else None
+        )
+        self._converter = None
+        self._pool = None
         
     def validate_files(self, files: List) -> None:
         """Validate the total size of the uploaded files."""
-        total_size = sum(os.path.getsize(f) for f in files)
+        total_size = sum(os.path.getsize(file_path(f)) for f in files)
         if total_size > constants.MAX_TOTAL_SIZE:
             raise ValueError(f"Total size exceeds {constants.MAX_TOTAL_SIZE//1024//1024}MB limit")
 
     def process(self, files: List) -> List:
-        """Process files with caching for subsequent queries"""
-        self.validate_files(files)
+        """Process files with caching for subsequent queries.
+
+        Returns every chunk of ``iter_documents`` in one list.
+        """
         all_chunks = []
-        seen_hashes = set()
+        for _, chunks in self.iter_documents(files):
+            all_chunks.extend(chunks)
+        return all_chunks
+
+    def iter_documents(self, files: List) -> Iterator[Tuple[str, List]]:
+        """Yield ``(file hash, chunks)`` for each file, in input order, as soon as its chunks are ready.
+
+        Uncached files start converting concurrently in a pool of worker
+        processes before anything is yielded; cached files are loaded when
+        their turn comes, so a consumer can index one file while later
+        ones convert. Chunks are tagged with their file's hash under
+        ``doc_hash`` and deduplicated within their file only: each file is
+        indexed whole, since its index entry is shared with every later
+        upload of it, and chunks repeated across files are merged at query
+        time by ``ScoredEnsembleRetriever``.
+        """
+        self.validate_files(files)
+        paths = [file_path(f) for f in files]
+        file_hashes = [None] * len(paths)
+        cache_paths = {}
+        pending = []
+        total = 0
         
-        for file in files:
+        for i, path in enumerate(paths):
             try:
                 # Generate content-based hash for caching
-                with open(file, "rb") as f:
-                    file_hash = self._generate_hash(f.read())
-                
-                cache_path = self.cache_dir / f"{file_hash}.pkl"
-                
-                if self._is_cache_valid(cache_path):
-                    logger.info(f"Loading from cache: {file}")
-                    chunks = self._load_from_cache(cache_path)
-                else:
-                    logger.info(f"Processing and caching: {file}")
-                    chunks = self._process_file(file)
-                    self._save_to_cache(chunks, cache_path)
+                file_hashes[i] = hash_file(path)
                 
-                # Deduplicate chunks across files
-                for chunk in chunks:
-                    chunk_hash = self._generate_hash(chunk.page_content.encode())
-                    if chunk_hash not in seen_hashes:
-                        all_chunks.append(chunk)
-                        seen_hashes.add(chunk_hash)
-                        
+                cache_path = self.cache.lookup(self._cache_name(file_hashes[i]))
             except Exception as e:
-                logger.error(f"Failed to process {file}: {str(e)}")
+                logger.error(f"Failed to process {path}: {str(e)}")
                 continue
+            if cache_path is None:
+                pending.append(i)
+            else:
+                cache_paths[i] = cache_path
+        # One index write for all of this upload's cache hits
+        self.cache.flush()
+
+        converted = self._convert_files([paths[i] for i in pending], pending)
+        pending = set(pending)
+        upcoming = None
+        try:
+            for i, path in enumerate(paths):
+                if i in cache_paths:
+                    logger.info(f"Loading from cache: {path}")
+                    chunks = self._load_from_cache(cache_paths[i])
+                    if chunks is None:
+                        # The entry was unreadable and has been dropped; convert the file in its place
+                        chunks = next((c for _, c in self._convert_files([path], [i])), None)
+                        if chunks is None:
+                            continue
+                        self._save_to_cache(chunks, self._cache_name(file_hashes[i]))
+                elif i in pending:
+                    # Files that failed to convert are skipped, so the next result may be for a later file
+                    if upcoming is None:
+                        upcoming = next(converted, None)
+                    if upcoming is None or upcoming[0] != i:
+                        continue
+                    chunks, upcoming = upcoming[1], None
+                    self._save_to_cache(chunks, self._cache_name(file_hashes[i]))
+                else:
+                    continue
+                chunks = self._tag_and_deduplicate(chunks, file_hashes[i])
+                total += len(chunks)
+                yield file_hashes[i], chunks
+        finally:
+            converted.close()
                 
-        logger.info(f"Total unique chunks: {len(all_chunks)}")
-        return all_chunks
+        logger.info(f"Total chunks: {total} (cache stats: {self.cache.stats()})")
+
+    def _tag_and_deduplicate(self, chunks: List, file_hash: str) -> List:
+        unique = []
+        seen_hashes = set()
+        for chunk in chunks:
+            chunk.metadata["doc_hash"] = file_hash
+            chunk_hash = self._generate_hash(chunk.page_content.encode())
+            if chunk_hash not in seen_hashes:
+                unique.append(chunk)
+                seen_hashes.add(chunk_hash)
+        return unique
+
+    def _convert_files(self, paths: List[str], indices: List[int]) -> Iterator[Tuple[int, List]]:
+        """Return an iterator of ``(index, chunks)`` for each file that converts successfully, in input order.
+
+        With several files the pool jobs are submitted before this returns,
+        so they convert while the caller is still busy with other files.
+        """
+        if len(paths) <= 1 or settings.CONVERSION_WORKERS <= 1:
+            return self._convert_in_process(paths, indices)
+        return self._collect_conversions(paths, indices, self._submit_conversions(paths))
+
+    def _convert_in_process(self, paths: List[str], indices: List[int]) -> Iterator[Tuple[int, List]]:
+        for i, path in zip(indices, paths):
+            try:
+                logger.info(f"Processing and caching: {path}")
+                plan = self._plan_pages(path)
+                if plan is None:
+                    yield i, self._process_file(path)
+                else:
+                    yield i, self._split_pages(plan, self._convert_pages(path, plan))
+            except Exception as e:
+                logger.error(f"Failed to process {path}: {str(e)}")
+
+    def _submit_conversions(self, paths: List[str]) -> List[Tuple]:
+        pool = self._get_pool()
+        logger.info(f"Converting {len(paths)} files with {settings.CONVERSION_WORKERS} workers")
+        jobs = []
+        for path in paths:
+            try:
+                plan = self._plan_pages(path)
+                if plan is None:
+                    jobs.append((None, pool.submit(_convert_in_worker, path, self.headers)))
+                elif plan["missing"]:
+                    jobs.append((plan, pool.submit(_convert_pages_in_worker, path, plan["convert"])))
+                else:
+                    jobs.append((plan, None))
+            except Exception as e:
+                jobs.append((None, None))
+                logger.error(f"Failed to process {path}: {str(e)}")
+        return jobs
+
+    def _collect_conversions(self, paths: List[str], indices: List[int], jobs: List[Tuple]) -> Iterator[Tuple[int, List]]:
+        try:
+            for i, path, (plan, future) in zip(indices, paths, jobs):
+                try:
+                    if plan is None:
+                        if future is None:
+                            continue
+                        yield i, future.result()
+                    else:
+                        yield i, self._split_pages(plan, future.result() if future else {})
+                    logger.info(f"Processed and cached: {path}")
+                except Exception as e:
+                    logger.error(f"Failed to process {path}: {str(e)}")
+        finally:
+            # A consumer that stops early leaves the files it did not reach unconverted
+            for _, future in jobs:
+                if future is not None:
+                    future.cancel()
+
+    def _plan_pages(self, path: str) -> Optional[Dict]:
+        """Find which pages of a PDF need converting; None to convert the file whole as before.
+
+        The plan holds the page digests, the Markdown of pages found in the
+        page cache, the pages still ``missing`` and the pages to hand to
+        Docling (``convert``; None for the whole file).
+        """
+        if self.page_cache is None or not path.lower().endswith(".pdf"):
+            return None
+        page_hashes = pdf_page_hashes(path)
+        if not page_hashes:
+            return None
+        keys = [self._page_key(h) for h in page_hashes]
+        found = self.page_cache.get_many(list(set(keys)))
+        cached = {page: found[key] for page, key in enumerate(keys) if key in found}
+        missing = [page for page in range(len(page_hashes)) if page not in cached]
+        logger.info(f"Page cache for {path}: {len(cached)} of {len(page_hashes)} pages reused")
+        return {
+            "page_hashes": page_hashes,
+            "cached": cached,
+            "missing": missing,
+            "convert": missing if cached else None,
+        }
 
-    def _process_file(self, file) -> List:
-        """Original processing logic with Docling"""
-        if not file.endswith(('.pdf', '.docx', '.txt', '.md')):
-            logger.warning(f"Skipping unsupported file type: {file.name}")
-            return []
+    def _convert_pages(self, path: str, plan: Dict) -> Dict[int, str]:
+        if not plan["missing"]:
+            return {}
+        if self._converter is None:
+            self._converter = _new_converter()
+        return convert_pages(self._converter, path, plan["convert"])
 
-        converter = DocumentConverter()
-        markdown = converter.convert(file.name).document.export_to_markdown()
-        splitter = MarkdownHeaderTextSplitter(self.headers)
-        return splitter.split_text(markdown)
+    def _split_pages(self, plan: Dict, converted: Dict[int, str]) -> List:
+        """Store newly converted pages, then split the whole document from the per-page Markdown."""
+        if converted:
+            self.page_cache.put_many({
+                self._page_key(plan["page_hashes"][page]): markdown for page, markdown in converted.items()
+            })
+        pages = {**plan["cached"], **converted}
+        page_markdown = [pages.get(page, "") for page in range(len(plan["page_hashes"]))]
+        return split_pages(page_markdown, plan["page_hashes"], self.headers, self.page_cache, self.cache_version)
+
+    def _page_key(self, page_hash: str) -> str:
+        return f"page:{self.cache_version}:{page_hash}"
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # Spawned rather than forked: the app process runs Gradio's threads
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=settings.CONVERSION_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker
+            )
+        return self._pool
+
+    def _process_file(self, path: str) -> List:
+        """Original processing logic with Docling, reusing one in-process converter"""
+        if self._converter is None:
+            self._converter = _new_converter()
+        return convert_and_split(self._converter, path, self.headers)
+
+    def warm_up(self) -> None:
+        """Load Docling in this process and start the conversion workers ahead of the first upload."""
+        if self._converter is None:
+            self._converter = _new_converter()
+        if settings.CONVERSION_WORKERS > 1:
+            pool = self._get_pool()
+            # Each no-op task makes the pool spawn a worker, which runs _init_worker
+            for _ in range(settings.CONVERSION_WORKERS):
+                pool.submit(int)
 
     def _generate_hash(self, content: bytes) -> str:
         return hashlib.sha256(content).hexdigest()
 
-    def _save_to_cache(self, chunks: List, cache_path: Path):
-        with open(cache_path, "wb") as f:
-            pickle.dump({
-                "timestamp": datetime.now().timestamp(),
-                "chunks": chunks
-            }, f)
-
-    def _load_from_cache(self, cache_path: Path) -> List:
-        with open(cache_path, "rb") as f:
-            data = pickle.load(f)
-        return data["chunks"]
-
-    def _is_cache_valid(self, cache_path: Path) -> bool:
-        if not cache_path.exists():
-            return False
-            
-        cache_age = datetime.now() - datetime.fromtimestamp(cache_path.stat().st_mtime)
-        return cache_age < timedelta(days=settings.CACHE_EXPIRE_DAYS)
\ No newline at end of file
+    def _cache_name(self, file_hash: str) -> str:
+        # The pipeline version in the name invalidates entries written by another format or splitter config
+        return f"{file_hash}-{self.cache_version}{CACHE_SUFFIX}"
+
+    def _save_to_cache(self, chunks: List, cache_name: str):
+        save_chunks(self.cache_dir / cache_name, chunks, created=datetime.now().timestamp())
+        self.cache.record(cache_name)
+
+    def _load_from_cache(self, cache_path: Path) -> Optional[List]:
+        try:
+            return load_chunks(cache_path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache entry {cache_path}: {str(e)}")
+            self.cache.discard(cache_path.name)
+            return None
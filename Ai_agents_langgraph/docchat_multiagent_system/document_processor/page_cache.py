@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from langchain.schema import Document
+from langchain_text_splitters import MarkdownHeaderTextSplitter
+
+from utils.logging import logger
+
+# File name of the page cache inside the document cache directory, whose size budget it shares
+PAGE_CACHE_FILE = "pages.sqlite3"
+
+# SQLite's default limit on host parameters per statement is 999
+_LOOKUP_BATCH = 500
+
+
+class PageCache:
+    """Disk-backed store of converted PDF pages and of the chunks split from runs of them.
+
+    Pages are keyed by a digest of their raw PDF content, so a revised
+    report reuses the Markdown of every page it did not change. Split
+    sections are keyed by the digests of the pages they cover and the
+    headers in force where they start. The least recently used rows are
+    dropped beyond ``max_entries``.
+    """
+
+    def __init__(self, path: str, max_entries: int):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, used REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, str]:
+        """Return the cached values for whichever of ``keys`` are present."""
+        found = {}
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(keys), _LOOKUP_BATCH):
+                batch = list(keys[start:start + _LOOKUP_BATCH])
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM entries WHERE key IN ({placeholders})", batch
+                )
+                found.update(rows)
+                self._conn.execute(
+                    f"UPDATE entries SET used = ? WHERE key IN ({placeholders})", [now, *batch]
+                )
+            self._conn.commit()
+        return found
+
+    def put_many(self, items: Dict[str, str]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, used) VALUES (?, ?, ?)",
+                [(key, value, now) for key, value in items.items()]
+            )
+            excess = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY used LIMIT ?)", (excess,)
+                )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+
+def pdf_page_hashes(path: str) -> Optional[List[str]]:
+    """SHA-256 of each page's raw content, or None if the PDF cannot be read page by page.
+
+    A page's digest covers its content streams, its size and the data of
+    the images and forms it draws, which is what Docling converts.
+    """
+    try:
+        from pypdf import PdfReader
+        reader = PdfReader(path)
+        if reader.is_encrypted:
+            return None
+        return [_page_digest(page) for page in reader.pages]
+    except Exception as e:
+        logger.warning(f"Could not hash pages of {path}, converting it whole: {str(e)}")
+        return None
+
+
+def _page_digest(page) -> str:
+    digest = hashlib.sha256()
+    digest.update(repr([float(v) for v in page.mediabox]).encode())
+    contents = page.get_contents()
+    if contents is not None:
+        digest.update(contents.get_data())
+    resources = page.get("/Resources")
+    xobjects = resources.get_object().get("/XObject") if resources is not None else None
+    if xobjects is not None:
+        xobjects = xobjects.get_object()
+        for name in sorted(xobjects):
+            digest.update(name.encode())
+            digest.update(xobjects[name].get_object().get_data())
+    return digest.hexdigest()
+
+
+def convert_pages(converter, path: str, pages: Optional[List[int]]) -> Dict[int, str]:
+    """Convert ``pages`` (0-based; None for all) of a PDF with Docling and return each page's Markdown.
+
+    Only the requested pages are handed to Docling, copied into a temporary PDF.
+    """
+    with tempfile.TemporaryDirectory(prefix="docchat-pages-") as tmp:
+        source = path
+        if pages is not None:
+            from pypdf import PdfReader, PdfWriter
+            reader = PdfReader(path)
+            writer = PdfWriter()
+            for page in pages:
+                writer.add_page(reader.pages[page])
+            source = os.path.join(tmp, "pages.pdf")
+            writer.write(source)
+        document = converter.convert(source).document
+
+    if pages is None:
+        pages = range(len(document.pages))
+    # Docling numbers pages from 1 within the document it converted
+    return {page: document.export_to_markdown(page_no=n) for n, page in enumerate(pages, start=1)}
+
+
+def split_pages(
+    page_markdown: List[str],
+    page_hashes: List[str],
+    headers: List[Tuple[str, str]],
+    cache: PageCache,
+    version: str
+) -> List[Document]:
+    """Split a document given as per-page Markdown, re-running the splitter only on changed sections.
+
+    Pages are grouped into sections that start on a page opening with a
+    header, so a section's chunks do not depend on its neighbours' text.
+    The headers in force at a section's start are prepended before
+    splitting it, which gives its chunks the same header metadata as
+    splitting the whole document would.
+    """
+    sections = _sections(page_markdown, headers)
+    keys = [
+        hashlib.sha256(json.dumps([version, context, page_hashes[start:stop]]).encode()).hexdigest()
+        for start, stop, context in sections
+    ]
+    cached = cache.get_many(keys)
+    splitter = MarkdownHeaderTextSplitter(headers)
+    chunks, new_sections = [], {}
+    for (start, stop, context), key in zip(sections, keys):
+        if key in cached:
+            chunks.extend(Document(**chunk) for chunk in json.loads(cached[key]))
+            continue
+        prefix = "".join(f"{separator} {text}\n" for separator, text in context)
+        section_chunks = splitter.split_text(prefix + "\n\n".join(page_markdown[start:stop]))
+        new_sections[key] = json.dumps(
+            [{"page_content": c.page_content, "metadata": c.metadata} for c in section_chunks], default=str
+        )
+        chunks.extend(section_chunks)
+    if new_sections:
+        cache.put_many(new_sections)
+    logger.info(f"Split {len(new_sections)} of {len(sections)} sections; reused the rest")
+    return chunks
+
+
+def _sections(page_markdown: List[str], headers: List[Tuple[str, str]]):
+    """Yield ``(start, stop, headers in force at start)`` for runs of pages that begin with a header."""
+    separators = sorted((separator for separator, _ in headers), key=len, reverse=True)
+    levels = {separator: len(separator) for separator in separators}
+    active: List[Tuple[str, str]] = []
+    sections = []
+    start, context = 0, []
+    for page, markdown in enumerate(page_markdown):
+        lines = [line.strip() for line in markdown.splitlines() if line.strip()]
+        if page > 0 and lines and _header(lines[0], separators):
+            sections.append((start, page, context))
+            start, context = page, list(active)
+        for line in lines:
+            header = _header(line, separators)
+            if header:
+                separator, text = header
+                active = [h for h in active if levels[h[0]] < levels[separator]] + [(separator, text)]
+    sections.append((start, len(page_markdown), context))
+    return sections
+
+
+def _header(line: str, separators: List[str]) -> Optional[Tuple[str, str]]:
+    # Same rule as MarkdownHeaderTextSplitter: the separator, then a space or the end of the line
+    for separator in separators:
+        if line.startswith(separator) and (len(line) == len(separator) or line[len(separator)] == " "):
+            return separator, line[len(separator):].strip()
+    return None
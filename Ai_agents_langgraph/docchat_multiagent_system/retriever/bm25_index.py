@@ -0,0 +1,284 @@
+import json
+import logging
+import math
+import os
+import re
+import threading
+from array import array
+from collections import Counter
+from typing import Any, Dict, FrozenSet, Iterable, List
+
+import numpy as np
+from langchain.schema import Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """Incrementally updatable Okapi BM25 index over document chunks.
+
+    Every chunk gets an integer id, and each term keeps its postings as two
+    parallel ``array('I')`` buffers (chunk ids and term frequencies), so
+    adding a document only appends to the postings of its own terms.
+    Removing a document marks its chunks dead; dead chunks are dropped from
+    the postings by ``compact()``, which ``save()`` runs once they make up a
+    quarter of the index. Scoring reads the postings as zero-copy NumPy views.
+    The chunk count, average length and document frequencies in the score
+    are taken over the chunks being searched, so a session's scores do not
+    depend on what other sessions have indexed.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._vocab: Dict[str, int] = {}
+        self._posting_ids: List[array] = []
+        self._posting_tfs: List[array] = []
+        self._chunk_lengths = array("I")
+        self._chunk_slots = array("I")
+        self._alive = bytearray()
+        self._texts: List[str] = []
+        self._metadatas: List[dict] = []
+        self._slots: Dict[str, int] = {}
+        self._slot_chunks: Dict[int, range] = {}
+        self._next_slot = 0
+        self._live_chunks = 0
+        self._length_array = None
+
+    def __contains__(self, doc_hash: str) -> bool:
+        return doc_hash in self._slots
+
+    def __len__(self) -> int:
+        return self._live_chunks
+
+    @property
+    def doc_hashes(self) -> FrozenSet[str]:
+        return frozenset(self._slots)
+
+    def add_document(self, doc_hash: str, chunks: List[Document]) -> None:
+        """Tokenize and index the chunks of one document."""
+        with self._lock:
+            if doc_hash in self._slots:
+                return
+            slot = self._slots[doc_hash] = self._next_slot
+            self._next_slot += 1
+            first_id = len(self._texts)
+            for chunk_id, chunk in enumerate(chunks, start=first_id):
+                tokens = tokenize(chunk.page_content)
+                for term, tf in Counter(tokens).items():
+                    term_id = self._vocab.get(term)
+                    if term_id is None:
+                        term_id = self._vocab[term] = len(self._posting_ids)
+                        self._posting_ids.append(array("I"))
+                        self._posting_tfs.append(array("I"))
+                    self._posting_ids[term_id].append(chunk_id)
+                    self._posting_tfs[term_id].append(tf)
+                self._chunk_lengths.append(len(tokens))
+                self._chunk_slots.append(slot)
+                self._alive.append(1)
+                self._texts.append(chunk.page_content)
+                self._metadatas.append(dict(chunk.metadata))
+            self._slot_chunks[slot] = range(first_id, len(self._texts))
+            self._live_chunks += len(chunks)
+            self._length_array = None
+
+    def remove_document(self, doc_hash: str) -> None:
+        """Mark the chunks of one document as deleted."""
+        with self._lock:
+            slot = self._slots.pop(doc_hash, None)
+            if slot is None:
+                return
+            for chunk_id in self._slot_chunks.pop(slot, range(0)):
+                self._alive[chunk_id] = 0
+                self._texts[chunk_id] = ""
+                self._metadatas[chunk_id] = {}
+                self._live_chunks -= 1
+
+    def search(self, query: str, k: int, doc_hashes: Iterable[str] = None) -> List[Document]:
+        """Return the top ``k`` live chunks for ``query``, optionally limited to ``doc_hashes``.
+
+        Each returned chunk carries its BM25 score under ``metadata["bm25_score"]``.
+        """
+        terms = Counter(tokenize(query))
+        with self._lock:
+            if not self._live_chunks or not terms or k <= 0:
+                return []
+            alive = np.frombuffer(self._alive, dtype=np.uint8).astype(bool)
+            if doc_hashes is not None:
+                selected = np.zeros(self._next_slot, dtype=bool)
+                selected[[self._slots[h] for h in doc_hashes if h in self._slots]] = True
+                alive &= selected[np.frombuffer(self._chunk_slots, dtype=np.uint32)]
+            # N and the average length cover only the searched chunks, so other documents do not shift the scores
+            live_chunks = int(np.count_nonzero(alive))
+            if not live_chunks:
+                return []
+            lengths = self._lengths()
+            avg_length = float(lengths[alive].mean())
+            norm = self.k1 * (1 - self.b + self.b * lengths / max(avg_length, 1e-9))
+
+            scores = np.zeros(len(self._texts), dtype=np.float32)
+            for term, query_tf in terms.items():
+                term_id = self._vocab.get(term)
+                if term_id is None:
+                    continue
+                ids = np.frombuffer(self._posting_ids[term_id], dtype=np.uint32)
+                tfs = np.frombuffer(self._posting_tfs[term_id], dtype=np.uint32).astype(np.float32)
+                df = int(np.count_nonzero(alive[ids]))
+                if not df:
+                    continue
+                idf = math.log((live_chunks - df + 0.5) / (df + 0.5) + 1.0)
+                scores[ids] += query_tf * idf * tfs * (self.k1 + 1) / (tfs + norm[ids])
+
+            scores[~alive] = -np.inf
+            candidates = np.flatnonzero(scores > 0)
+            if len(candidates) > k:
+                candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+            ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+            return [
+                Document(page_content=self._texts[i], metadata={**self._metadatas[i], "bm25_score": float(scores[i])})
+                for i in ranked
+            ]
+
+    def _lengths(self) -> np.ndarray:
+        if self._length_array is None:
+            self._length_array = np.frombuffer(self._chunk_lengths, dtype=np.uint32).astype(np.float32)
+        return self._length_array
+
+    def compact(self) -> None:
+        """Drop dead chunks from the postings and renumber the live ones."""
+        with self._lock:
+            alive = np.frombuffer(self._alive, dtype=np.uint8).astype(bool)
+            if alive.all():
+                return
+            new_ids = np.cumsum(alive, dtype=np.int64) - 1
+            vocab, posting_ids, posting_tfs = {}, [], []
+            for term, term_id in self._vocab.items():
+                ids = np.frombuffer(self._posting_ids[term_id], dtype=np.uint32)
+                keep = alive[ids]
+                if not keep.any():
+                    continue
+                tfs = np.frombuffer(self._posting_tfs[term_id], dtype=np.uint32)
+                vocab[term] = len(posting_ids)
+                posting_ids.append(array("I", new_ids[ids[keep]].astype(np.uint32).tobytes()))
+                posting_tfs.append(array("I", tfs[keep].tobytes()))
+
+            live = np.flatnonzero(alive)
+            slot_map = {slot: i for i, slot in enumerate(sorted(self._slots.values()))}
+            old_slots = np.frombuffer(self._chunk_slots, dtype=np.uint32)[live]
+            self._chunk_lengths = array("I", np.frombuffer(self._chunk_lengths, dtype=np.uint32)[live].tobytes())
+            self._chunk_slots = array("I", [slot_map[int(s)] for s in old_slots])
+            self._texts = [self._texts[i] for i in live]
+            self._metadatas = [self._metadatas[i] for i in live]
+            self._alive = bytearray(b"\x01" * len(live))
+            self._vocab, self._posting_ids, self._posting_tfs = vocab, posting_ids, posting_tfs
+            self._slots = {h: slot_map[s] for h, s in self._slots.items()}
+            self._next_slot = len(slot_map)
+            # Documents without chunks keep an empty range
+            self._slot_chunks = {slot: range(0) for slot in self._slots.values()}
+            for chunk_id, slot in enumerate(self._chunk_slots):
+                current = self._slot_chunks[slot]
+                self._slot_chunks[slot] = range(current.start if current else chunk_id, chunk_id + 1)
+            self._length_array = None
+
+    def save(self, directory: str) -> None:
+        """Persist the index as NumPy arrays plus a JSON sidecar in ``directory``."""
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            if len(self._texts) and self._live_chunks < 0.75 * len(self._texts):
+                self.compact()
+            offsets = np.zeros(len(self._posting_ids) + 1, dtype=np.uint64)
+            offsets[1:] = np.cumsum([len(p) for p in self._posting_ids])
+            arrays = {
+                "term_offsets": offsets,
+                "posting_ids": np.frombuffer(b"".join(p.tobytes() for p in self._posting_ids), dtype=np.uint32),
+                "posting_tfs": np.frombuffer(b"".join(p.tobytes() for p in self._posting_tfs), dtype=np.uint32),
+                "chunk_lengths": np.frombuffer(self._chunk_lengths, dtype=np.uint32),
+                "chunk_slots": np.frombuffer(self._chunk_slots, dtype=np.uint32),
+                "alive": np.frombuffer(self._alive, dtype=np.uint8),
+            }
+            header = {
+                "format_version": FORMAT_VERSION,
+                "k1": self.k1,
+                "b": self.b,
+                "terms": sorted(self._vocab, key=self._vocab.get),
+                "slots": self._slots,
+                "texts": self._texts,
+                "metadatas": self._metadatas,
+            }
+            _atomic_write(os.path.join(directory, "bm25.npz"), lambda f: np.savez(f, **arrays))
+            _atomic_write(
+                os.path.join(directory, "bm25.json"),
+                lambda f: f.write(json.dumps(header).encode("utf-8"))
+            )
+
+    @classmethod
+    def load(cls, directory: str) -> "BM25Index":
+        """Load a saved index, or return an empty one if none (or an incompatible one) exists."""
+        json_path = os.path.join(directory, "bm25.json")
+        npz_path = os.path.join(directory, "bm25.npz")
+        if not (os.path.exists(json_path) and os.path.exists(npz_path)):
+            return cls()
+        with open(json_path, "r", encoding="utf-8") as f:
+            header = json.load(f)
+        if header.get("format_version") != FORMAT_VERSION:
+            logger.warning(f"Ignoring BM25 index with format version {header.get('format_version')}.")
+            return cls()
+
+        index = cls(k1=header["k1"], b=header["b"])
+        with np.load(npz_path) as data:
+            offsets = data["term_offsets"]
+            posting_ids = data["posting_ids"]
+            posting_tfs = data["posting_tfs"]
+            for term_id, term in enumerate(header["terms"]):
+                start, end = int(offsets[term_id]), int(offsets[term_id + 1])
+                index._vocab[term] = term_id
+                index._posting_ids.append(array("I", posting_ids[start:end].tobytes()))
+                index._posting_tfs.append(array("I", posting_tfs[start:end].tobytes()))
+            index._chunk_lengths = array("I", data["chunk_lengths"].tobytes())
+            index._chunk_slots = array("I", data["chunk_slots"].tobytes())
+            index._alive = bytearray(data["alive"].tobytes())
+
+        index._texts = header["texts"]
+        index._metadatas = header["metadatas"]
+        index._slots = header["slots"]
+        # Documents without chunks hold a slot too, so neither list alone gives the next free one
+        index._next_slot = max(max(index._chunk_slots, default=-1), max(index._slots.values(), default=-1)) + 1
+        index._slot_chunks = {slot: range(0) for slot in index._slots.values()}
+        for chunk_id, slot in enumerate(index._chunk_slots):
+            if slot in index._slot_chunks:
+                current = index._slot_chunks[slot]
+                index._slot_chunks[slot] = range(current.start if current else chunk_id, chunk_id + 1)
+        alive = np.frombuffer(index._alive, dtype=np.uint8).astype(bool)
+        index._live_chunks = int(alive.sum())
+        logger.info(f"Loaded BM25 index with {index._live_chunks} chunks from {directory}.")
+        return index
+
+
+def _atomic_write(path: str, write) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+class BM25IndexRetriever(BaseRetriever):
+    """Retriever over a shared ``BM25Index``, restricted to a set of documents."""
+
+    index: Any
+    doc_hashes: FrozenSet[str]
+    k: int = 4
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self.index.search(query, self.k, self.doc_hashes)
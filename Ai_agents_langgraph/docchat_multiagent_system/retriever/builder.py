@@ -1,55 +1,144 @@
-from langchain_community.vectorstores import Chroma
-from langchain_community.retrievers import BM25Retriever
-from langchain.retrievers import EnsembleRetriever
-from config.settings import settings
-import logging
-import os
-import json
-from langchain_core.tools import tool
-from langchain_groq import ChatGroq
-from langchain_mistralai import MistralAIEmbeddings
-from dotenv import load_dotenv
+import threading
 
-load_dotenv()
+from langchain.retrievers import ContextualCompressionRetriever
 
-groq_api_key = os.getenv("GROQ_API_KEY")
-mistral_api_key = os.getenv("MISTRAL_API_KEY")
+from config.settings import settings
+from utils.clients import get_embeddings
+from .embedding_cache import CachedEmbeddings, EmbeddingCache
+from .embedding_executor import EmbeddingExecutor
+from .index_manager import IndexManager
+from .reranker import ScoringReranker, create_reranker
+from .scored_ensemble import ScoredEnsembleRetriever
+import logging
 
 logger = logging.getLogger(__name__)
 
+def embedding_cache_name() -> str:
+    """Model name for embedding cache keys; stand-in backends get their own namespace."""
+    if settings.EMBEDDING_BACKEND == "mistral":
+        return settings.EMBEDDING_MODEL
+    return f"{settings.EMBEDDING_BACKEND}:{settings.EMBEDDING_MODEL}"
+
 class RetrieverBuilder:
+    """Builds hybrid retrievers; the embeddings client and indexes are opened on first use."""
+
     def __init__(self):
-        """Initialize the retriever builder with embeddings."""
-        self.embeddings =  MistralAIEmbeddings(
-        model="mistral-embed"
-    )
+        self._embeddings = None
+        self._index_manager = None
+        self._reranker = None
+        self._lock = threading.RLock()
+
+    @property
+    def embeddings(self) -> CachedEmbeddings:
+        with self._lock:
+            if self._embeddings is None:
+                # Cache misses are embedded in concurrent, token-bounded batches
+                embeddings = get_embeddings(settings.EMBEDDING_MODEL)
+                executor = EmbeddingExecutor(
+                    embeddings.embed_documents,
+                    max_batch_tokens=settings.EMBEDDING_MAX_BATCH_TOKENS,
+                    max_batch_size=settings.EMBEDDING_MAX_BATCH_SIZE,
+                    max_concurrency=settings.EMBEDDING_MAX_CONCURRENCY,
+                    requests_per_minute=settings.EMBEDDING_REQUESTS_PER_MINUTE
+                )
+                self._embeddings = CachedEmbeddings(
+                    embeddings,
+                    cache=EmbeddingCache(settings.EMBEDDING_CACHE_PATH),
+                    model_name=embedding_cache_name(),
+                    executor=executor
+                )
+            return self._embeddings
+
+    @property
+    def index_manager(self) -> IndexManager:
+        # Guarded so a warm-up thread and the first request never open the collection twice
+        with self._lock:
+            if self._index_manager is None:
+                self._index_manager = IndexManager(
+                    embeddings=self.embeddings,
+                    persist_directory=settings.CHROMA_DB_PATH,
+                    collection_name=settings.CHROMA_COLLECTION_NAME,
+                    bm25_directory=settings.BM25_INDEX_PATH,
+                    batch_size=settings.INDEX_BATCH_SIZE
+                )
+            return self._index_manager
+
+    @property
+    def reranker(self) -> ScoringReranker:
+        """Reranker selected by ``RERANKER``, or None when re-ranking is off; a cross-encoder is loaded once."""
+        with self._lock:
+            if self._reranker is None:
+                self._reranker = create_reranker(
+                    settings.RERANKER,
+                    top_n=settings.RERANK_TOP_N,
+                    model_name=settings.RERANKER_MODEL,
+                    batch_size=settings.RERANK_BATCH_SIZE
+                )
+            return self._reranker
+
+    def warm_up(self) -> None:
+        """Open the Chroma collection, load the BM25 index and the reranker ahead of the first upload."""
+        self.index_manager
+        self.reranker
         
-    def build_hybrid_retriever(self, docs):
-        """Build a hybrid retriever using BM25 and vector-based retrieval."""
+    def build_hybrid_retriever(self, docs, previous_hashes=frozenset()):
+        """Build a hybrid retriever using BM25 and vector-based retrieval.
+
+        ``previous_hashes`` is the document set of the retriever being
+        replaced; only documents new to the Chroma collection and BM25 index
+        are embedded and tokenized, and documents dropped from the set are
+        deleted. The resulting document set is stored in the retriever's
+        ``metadata["doc_hashes"]``.
+        """
         try:
-            # Create Chroma vector store
-            vector_store = Chroma.from_documents(
-                documents=docs,
-                embedding=self.embeddings,
-                persist_directory=settings.CHROMA_DB_PATH
-            )
-            logger.info("Vector store created successfully.")
-            
-            # Create BM25 retriever
-            bm25 = BM25Retriever.from_documents(docs)
-            logger.info("BM25 retriever created successfully.")
-            
-            # Create vector-based retriever
-            vector_retriever = vector_store.as_retriever(search_kwargs={"k": settings.VECTOR_SEARCH_K})
-            logger.info("Vector retriever created successfully.")
-            
-            # Combine retrievers into a hybrid retriever
-            hybrid_retriever = EnsembleRetriever(
-                retrievers=[bm25, vector_retriever],
-                weights=settings.HYBRID_RETRIEVER_WEIGHTS
-            )
-            logger.info("Hybrid retriever created successfully.")
-            return hybrid_retriever
+            # Update the persisted Chroma collection and BM25 index with just the changed documents
+            doc_hashes = self.index_manager.sync(previous_hashes, docs)
+            logger.info("Vector store and BM25 index updated successfully.")
+            return self._hybrid_retriever(doc_hashes)
+        except Exception as e:
+            logger.error(f"Failed to build hybrid retriever: {e}")
+            raise
+
+    def build_hybrid_retriever_streaming(self, documents, previous_hashes=frozenset()):
+        """Build a hybrid retriever from ``(doc_hash, chunks)`` pairs produced one document at a time.
+
+        Each document is embedded and indexed as it arrives while the
+        producer, e.g. ``DocumentProcessor.iter_documents``, works on the
+        next one, at most ``INGEST_QUEUE_SIZE`` documents ahead.
+        """
+        try:
+            doc_hashes = self.index_manager.sync_stream(previous_hashes, documents, settings.INGEST_QUEUE_SIZE)
+            logger.info("Vector store and BM25 index updated successfully.")
+            return self._hybrid_retriever(doc_hashes)
         except Exception as e:
             logger.error(f"Failed to build hybrid retriever: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    def _hybrid_retriever(self, doc_hashes):
+        # Create BM25 retriever
+        bm25 = self.index_manager.bm25_retriever(doc_hashes, k=settings.BM25_SEARCH_K)
+        logger.info("BM25 retriever created successfully.")
+
+        # Create vector-based retriever
+        vector_retriever = self.index_manager.vector_retriever(doc_hashes, k=settings.VECTOR_SEARCH_K)
+        logger.info("Vector retriever created successfully.")
+
+        # Combine retrievers into a hybrid retriever
+        hybrid_retriever = ScoredEnsembleRetriever(
+            retrievers=[bm25, vector_retriever],
+            weights=settings.HYBRID_RETRIEVER_WEIGHTS,
+            metadata={"doc_hashes": doc_hashes}
+        )
+        logger.info("Hybrid retriever created successfully.")
+
+        # Optionally re-rank the fused candidates and keep only the top RERANK_TOP_N for the prompts
+        reranker = self.reranker
+        if reranker is None:
+            return hybrid_retriever
+        reranking_retriever = ContextualCompressionRetriever(
+            base_compressor=reranker,
+            base_retriever=hybrid_retriever,
+            metadata={"doc_hashes": doc_hashes}
+        )
+        logger.info(f"Re-ranking retriever created with the {settings.RERANKER} reranker.")
+        return reranking_retriever
@@ -0,0 +1,125 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from utils.tracing import tracer
+
+from .embedding_executor import EmbeddingExecutor
+
+logger = logging.getLogger(__name__)
+
+# SQLite's default limit on host parameters per statement is 999
+_LOOKUP_BATCH = 500
+
+
+class EmbeddingCache:
+    """Disk-backed store of embedding vectors keyed by model name and chunk content."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Return the cached vectors for whichever of ``keys`` are present."""
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), _LOOKUP_BATCH):
+                batch = keys[start:start + _LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                )
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        rows = [
+            (key, np.asarray(vector, dtype=np.float32).tobytes())
+            for key, vector in items.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only sends texts missing from the cache to the model.
+
+    With an ``executor``, the missing texts are embedded in its concurrent,
+    token-bounded batches and queries go through its rate limits.
+    ``dimension`` is the vector length, known once a text was embedded.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        cache: EmbeddingCache,
+        model_name: str,
+        executor: Optional[EmbeddingExecutor] = None
+    ):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_name = model_name
+        self.executor = executor
+        self.dimension: Optional[int] = None
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [EmbeddingCache.make_key(self.model_name, text) for text in texts]
+        cached = self.cache.get_many(list(set(keys)))
+
+        # Embed each distinct missing text once, even if it repeats in the batch
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        logger.info(
+            f"Embedding cache: {len(texts) - len(missing)} hits, {len(missing)} misses "
+            f"for {len(texts)} texts"
+        )
+
+        if missing:
+            texts_to_embed = list(missing.values())
+            if self.executor is not None:
+                # The executor returns one float32 array; keep its rows as they are
+                with tracer.span("embed", texts=len(texts_to_embed)):
+                    vectors = self.executor.embed(texts_to_embed)
+            else:
+                vectors = self.embeddings.embed_documents(texts_to_embed)
+            new_items = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(new_items)
+            for key, vector in new_items.items():
+                cached[key] = np.asarray(vector, dtype=np.float32)
+
+        if keys:
+            self.dimension = len(cached[keys[0]])
+        return [cached[key].tolist() for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.executor is not None:
+            return self.executor.run(self.embeddings.embed_query, text)
+        return self.embeddings.embed_query(text)
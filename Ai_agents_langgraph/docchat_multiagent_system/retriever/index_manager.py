@@ -0,0 +1,234 @@
+import hashlib
+import logging
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, FrozenSet, Iterable, List, Tuple
+
+from langchain.schema import Document
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStoreRetriever
+
+from utils.streams import prefetch
+
+from .bm25_index import BM25Index, BM25IndexRetriever
+
+logger = logging.getLogger(__name__)
+
+DOC_HASH_KEY = "doc_hash"
+
+
+class IndexManager:
+    """Keeps the persisted Chroma collection and BM25 index in sync with the uploaded documents.
+
+    Chunks are stored with the SHA-256 of their source file under the
+    ``doc_hash`` metadata key, so a document can be added or deleted as a
+    unit. Each document is indexed once and reference counted across the
+    file sets that use it; sessions search only their own documents through
+    a metadata filter.
+
+    Embedding runs outside the manager-wide lock under a per-document lock,
+    so sessions uploading different documents index them concurrently and
+    sessions uploading the same document embed it only once.
+
+    References live only as long as the process, so documents persisted by
+    an earlier process are unreferenced and are deleted on startup; a
+    re-upload re-indexes them from the embedding cache.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        persist_directory: str,
+        collection_name: str,
+        bm25_directory: str,
+        batch_size: int = 256
+    ):
+        # Imported here so that importing the retriever package does not load chromadb
+        from langchain_community.vectorstores import Chroma
+
+        self.vector_store = Chroma(
+            collection_name=collection_name,
+            embedding_function=embeddings,
+            persist_directory=persist_directory
+        )
+        self._lock = threading.Lock()
+        self._document_locks: Dict[str, threading.Lock] = {}
+        self._refs = Counter()
+        self._indexed = self._load_indexed_hashes()
+        self.bm25_directory = bm25_directory
+        self.bm25_index = BM25Index.load(bm25_directory)
+        self.batch_size = batch_size
+        logger.info(f"Index manager found {len(self._indexed)} documents in '{collection_name}'.")
+        self._collect_garbage()
+
+    def _load_indexed_hashes(self) -> set:
+        metadatas = self.vector_store.get(include=["metadatas"])["metadatas"]
+        return {m[DOC_HASH_KEY] for m in metadatas if m and DOC_HASH_KEY in m}
+
+    def _collect_garbage(self) -> None:
+        """Delete the documents left by an earlier process, which no file set references."""
+        orphans = self._indexed | set(self.bm25_index.doc_hashes)
+        for doc_hash in orphans:
+            self._delete(doc_hash)
+        if orphans:
+            self.bm25_index.save(self.bm25_directory)
+            logger.info(f"Deleted {len(orphans)} unreferenced documents left by an earlier run.")
+
+    def sync(self, previous_hashes: FrozenSet[str], docs: List[Document]) -> FrozenSet[str]:
+        """Move a file set from ``previous_hashes`` to the documents behind ``docs``.
+
+        Only documents that are not indexed yet are embedded, and documents
+        dropped from the set are deleted once nothing references them.
+        Returns the new set of document hashes.
+        """
+        return self._sync(previous_hashes, group_by_document(docs).items())
+
+    def sync_stream(
+        self,
+        previous_hashes: FrozenSet[str],
+        documents: Iterable[Tuple[str, List[Document]]],
+        queue_size: int
+    ) -> FrozenSet[str]:
+        """Like ``sync``, for documents that arrive one at a time as ``(doc_hash, chunks)``.
+
+        ``documents`` is consumed on a background thread at most
+        ``queue_size`` documents ahead, so the next document is converted
+        while this one is embedded, and only those few are held in memory.
+        """
+        return self._sync(previous_hashes, prefetch(documents, queue_size, name="index-sync"))
+
+    def _sync(self, previous_hashes: FrozenSet[str], documents: Iterable[Tuple[str, List[Document]]]) -> FrozenSet[str]:
+        current_hashes, added = set(), []
+        bm25_changed = False
+        try:
+            for doc_hash, chunks in documents:
+                if doc_hash in current_hashes:
+                    continue
+                current_hashes.add(doc_hash)
+                chunks = _unique_chunks(chunks)
+                # The reference taken here keeps the document from being deleted while it is embedded
+                with self._lock:
+                    if doc_hash not in previous_hashes:
+                        self._refs[doc_hash] += 1
+                        added.append(doc_hash)
+                    indexed = doc_hash in self._indexed
+                if not indexed:
+                    with self._document_lock(doc_hash):
+                        if doc_hash not in self._indexed:
+                            self._add_document(doc_hash, chunks)
+                with self._lock:
+                    if doc_hash not in self.bm25_index:
+                        self.bm25_index.add_document(doc_hash, chunks)
+                        bm25_changed = True
+        except BaseException:
+            # Give back the references of a set that will never be used
+            with self._lock:
+                released = [h for h in added if self._release(h)]
+                if bm25_changed or released:
+                    self.bm25_index.save(self.bm25_directory)
+            raise
+
+        current_hashes = frozenset(current_hashes)
+        removed = previous_hashes - current_hashes
+        with self._lock:
+            released = [h for h in removed if self._release(h)]
+            if bm25_changed or released:
+                self.bm25_index.save(self.bm25_directory)
+
+        logger.info(
+            f"Index sync: {len(added)} added, {len(removed)} removed, "
+            f"{len(current_hashes)} documents in set."
+        )
+        return current_hashes
+
+    def release(self, doc_hashes: Iterable[str]) -> None:
+        """Drop one reference to each of ``doc_hashes``, deleting documents nothing references anymore."""
+        with self._lock:
+            released = [h for h in doc_hashes if self._release(h)]
+            if released:
+                self.bm25_index.save(self.bm25_directory)
+
+    def _document_lock(self, doc_hash: str) -> threading.Lock:
+        with self._lock:
+            return self._document_locks.setdefault(doc_hash, threading.Lock())
+
+    def _add_document(self, doc_hash: str, chunks: List[Document]) -> None:
+        ids = [
+            f"{doc_hash}:{hashlib.sha256(chunk.page_content.encode()).hexdigest()}"
+            for chunk in chunks
+        ]
+        # Embedded and inserted in batches, so a long document is never embedded in one request
+        for start in range(0, len(chunks), self.batch_size):
+            stop = start + self.batch_size
+            self.vector_store.add_documents(documents=chunks[start:stop], ids=ids[start:stop])
+        with self._lock:
+            self._indexed.add(doc_hash)
+        logger.info(f"Indexed {len(chunks)} chunks for document {doc_hash[:12]}.")
+
+    def _release(self, doc_hash: str) -> bool:
+        """Drop one reference to a document, deleting it once unreferenced."""
+        self._refs[doc_hash] -= 1
+        if self._refs[doc_hash] > 0:
+            return False
+        del self._refs[doc_hash]
+        self._delete(doc_hash)
+        return True
+
+    def _delete(self, doc_hash: str) -> None:
+        ids = self.vector_store.get(where={DOC_HASH_KEY: doc_hash})["ids"]
+        if ids:
+            self.vector_store.delete(ids=ids)
+        self._indexed.discard(doc_hash)
+        self._document_locks.pop(doc_hash, None)
+        self.bm25_index.remove_document(doc_hash)
+        logger.info(f"Deleted {len(ids)} chunks for document {doc_hash[:12]}.")
+
+    def vector_retriever(self, doc_hashes: Iterable[str], k: int) -> "ScoredVectorRetriever":
+        """Vector retriever restricted to the chunks of ``doc_hashes``."""
+        search_filter = {DOC_HASH_KEY: {"$in": sorted(doc_hashes)}}
+        return ScoredVectorRetriever(vectorstore=self.vector_store, search_kwargs={"k": k, "filter": search_filter})
+
+    def bm25_retriever(self, doc_hashes: Iterable[str], k: int) -> BM25IndexRetriever:
+        """BM25 retriever restricted to the chunks of ``doc_hashes``."""
+        return BM25IndexRetriever(index=self.bm25_index, doc_hashes=frozenset(doc_hashes), k=k)
+
+
+class ScoredVectorRetriever(VectorStoreRetriever):
+    """Similarity retriever that keeps each chunk's relevance score (0 to 1) under ``metadata["vector_score"]``."""
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun, **kwargs: Any
+    ) -> List[Document]:
+        results = self.vectorstore.similarity_search_with_relevance_scores(query, **{**self.search_kwargs, **kwargs})
+        return [_with_vector_score(doc, score) for doc, score in results]
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun, **kwargs: Any
+    ) -> List[Document]:
+        results = await self.vectorstore.asimilarity_search_with_relevance_scores(
+            query, **{**self.search_kwargs, **kwargs}
+        )
+        return [_with_vector_score(doc, score) for doc, score in results]
+
+
+def _with_vector_score(doc: Document, score: float) -> Document:
+    return Document(page_content=doc.page_content, metadata={**doc.metadata, "vector_score": float(score)})
+
+
+def group_by_document(docs: List[Document]) -> Dict[str, List[Document]]:
+    """Group chunks by their source document hash, dropping duplicates within a document."""
+    grouped = defaultdict(list)
+    for doc in docs:
+        grouped[doc.metadata[DOC_HASH_KEY]].append(doc)
+    return {doc_hash: _unique_chunks(chunks) for doc_hash, chunks in grouped.items()}
+
+
+def _unique_chunks(chunks: List[Document]) -> List[Document]:
+    seen = set()
+    unique = []
+    for chunk in chunks:
+        if chunk.page_content not in seen:
+            seen.add(chunk.page_content)
+            unique.append(chunk)
+    return unique
@@ -0,0 +1,164 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, FrozenSet, Iterable, List, Tuple
+
+from langchain.schema import Document
+
+from .bm25_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Bytes of one BM25 posting: a chunk id and a term frequency, both uint32
+_POSTING_BYTES = 8
+# Rough per-chunk cost of the HNSW graph links, ids and metadata
+_CHUNK_OVERHEAD = 256
+
+
+class _Entry:
+    __slots__ = ("retriever", "refs", "size")
+
+    def __init__(self, retriever, size: int):
+        self.retriever = retriever
+        self.refs = 0
+        self.size = size
+
+
+class RetrieverHandle:
+    """A session's reference to a shared retriever. Call ``release`` when the session is done with it."""
+
+    def __init__(self, registry: "RetrieverRegistry", file_hashes: FrozenSet[str], retriever):
+        self.registry = registry
+        self.file_hashes = file_hashes
+        self.retriever = retriever
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self.registry.release(self.file_hashes)
+
+
+class RetrieverRegistry:
+    """Process-wide cache of hybrid retrievers keyed by the frozenset of uploaded file hashes.
+
+    Sessions that upload the same files share one retriever through
+    reference-counted handles. Retrievers no session holds stay cached for
+    reuse and are evicted least recently used first once their estimated
+    memory footprint exceeds ``max_bytes``; eviction releases their
+    documents from the shared Chroma collection and BM25 index.
+
+    A retriever's footprint is estimated from its chunks: their text, one
+    float32 embedding vector each, a BM25 posting per distinct term and a
+    fixed overhead for the vector index. Documents shared between file
+    sets are counted once per retriever, so the estimate errs high.
+    """
+
+    def __init__(self, builder, max_bytes: int):
+        self.builder = builder
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[FrozenSet[str], _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks: Dict[FrozenSet[str], threading.Lock] = {}
+
+    def acquire(
+        self,
+        file_hashes: FrozenSet[str],
+        load_documents: Callable[[], Iterable[Tuple[str, List[Document]]]]
+    ) -> RetrieverHandle:
+        """Return a handle to the retriever for ``file_hashes``, building it from ``load_documents()`` if needed.
+
+        ``load_documents`` returns ``(doc_hash, chunks)`` pairs, which are
+        indexed as they are produced. Concurrent requests for the same file
+        set wait for a single build.
+        """
+        handle = self._acquire_existing(file_hashes)
+        if handle is not None:
+            return handle
+
+        with self._lock:
+            build_lock = self._build_locks.setdefault(file_hashes, threading.Lock())
+        with build_lock:
+            handle = self._acquire_existing(file_hashes)
+            if handle is not None:
+                return handle
+
+            text_bytes = chunk_count = posting_count = 0
+
+            def measured():
+                nonlocal text_bytes, chunk_count, posting_count
+                for doc_hash, chunks in load_documents():
+                    for chunk in chunks:
+                        text_bytes += len(chunk.page_content.encode("utf-8"))
+                        posting_count += len(set(tokenize(chunk.page_content)))
+                    chunk_count += len(chunks)
+                    yield doc_hash, chunks
+
+            try:
+                retriever = self.builder.build_hybrid_retriever_streaming(measured())
+            finally:
+                with self._lock:
+                    self._build_locks.pop(file_hashes, None)
+            # The vector length is known once the build has embedded something
+            vector_bytes = 4 * (getattr(self.builder.embeddings, "dimension", None) or 0)
+            size = text_bytes + chunk_count * (vector_bytes + _CHUNK_OVERHEAD) + posting_count * _POSTING_BYTES
+            with self._lock:
+                entry = _Entry(retriever, size)
+                entry.refs = 1
+                self._entries[file_hashes] = entry
+                logger.info(f"Registered retriever for {len(file_hashes)} files (~{size} bytes in memory).")
+                evicted = self._evict_idle()
+            self._release_documents(evicted)
+            return RetrieverHandle(self, file_hashes, retriever)
+
+    def release(self, file_hashes: FrozenSet[str]) -> None:
+        """Drop one session's reference; the retriever stays cached until evicted."""
+        with self._lock:
+            entry = self._entries.get(file_hashes)
+            if entry is None:
+                return
+            entry.refs = max(entry.refs - 1, 0)
+            evicted = self._evict_idle()
+        self._release_documents(evicted)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "retrievers": len(self._entries),
+                "in_use": sum(1 for entry in self._entries.values() if entry.refs),
+                "bytes": self._total_bytes(),
+                "max_bytes": self.max_bytes,
+            }
+
+    def _acquire_existing(self, file_hashes: FrozenSet[str]):
+        with self._lock:
+            entry = self._entries.get(file_hashes)
+            if entry is None:
+                return None
+            entry.refs += 1
+            self._entries.move_to_end(file_hashes)
+            return RetrieverHandle(self, file_hashes, entry.retriever)
+
+    def _total_bytes(self) -> int:
+        return sum(entry.size for entry in self._entries.values())
+
+    def _evict_idle(self) -> List[_Entry]:
+        """Drop idle entries down to ``max_bytes`` and return them; call under the lock."""
+        evicted = []
+        total = self._total_bytes()
+        for file_hashes in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            entry = self._entries[file_hashes]
+            if entry.refs:
+                continue
+            del self._entries[file_hashes]
+            total -= entry.size
+            evicted.append(entry)
+            logger.info(f"Evicted idle retriever for {len(file_hashes)} files.")
+        return evicted
+
+    def _release_documents(self, evicted: List[_Entry]) -> None:
+        # Chroma deletes and BM25 saves run outside the registry lock, so other sessions are not held up
+        for entry in evicted:
+            self.builder.index_manager.release(entry.retriever.metadata["doc_hashes"])
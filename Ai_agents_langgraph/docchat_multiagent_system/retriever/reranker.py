@@ -0,0 +1,125 @@
+import logging
+import threading
+from typing import Any, List, Optional, Sequence
+
+import numpy as np
+from langchain.schema import Document
+from langchain_core.callbacks import Callbacks
+from langchain_core.documents import BaseDocumentCompressor
+
+from utils.tracing import tracer
+
+from .bm25_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+class ScoringReranker(BaseDocumentCompressor):
+    """Document compressor that scores all candidates for a query in one batch and keeps the best ``top_n``.
+
+    Kept documents are copies in score order carrying their score under
+    ``metadata["rerank_score"]``, which the context packer ranks by.
+    """
+
+    top_n: int = 6
+
+    def score(self, query: str, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+    def compress_documents(
+        self,
+        documents: Sequence[Document],
+        query: str,
+        callbacks: Optional[Callbacks] = None
+    ) -> Sequence[Document]:
+        if not documents:
+            return []
+        with tracer.span("rerank", reranker=type(self).__name__, candidates=len(documents)) as span:
+            scores = self.score(query, [doc.page_content for doc in documents])
+            order = np.argsort(-scores, kind="stable")[:self.top_n]
+            span.set(documents=len(order))
+        logger.info(f"Re-ranked {len(documents)} candidates, keeping {len(order)}")
+        return [
+            Document(
+                page_content=documents[i].page_content,
+                metadata={**documents[i].metadata, "rerank_score": float(scores[i])}
+            )
+            for i in order
+        ]
+
+
+class LexicalReranker(ScoringReranker):
+    """Re-ranks candidates by BM25 over the candidate set, boosted by the share of query terms they cover.
+
+    Term frequencies of the query terms are gathered into one
+    candidates-by-terms matrix and scored with array operations, so a
+    candidate set costs about one pass of tokenization. No model is needed.
+    """
+
+    k1: float = 1.5
+    b: float = 0.75
+
+    def score(self, query: str, texts: List[str]) -> np.ndarray:
+        terms = {term: column for column, term in enumerate(dict.fromkeys(tokenize(query)))}
+        if not terms:
+            return np.zeros(len(texts), dtype=np.float32)
+
+        tf = np.zeros((len(texts), len(terms)), dtype=np.float32)
+        lengths = np.empty(len(texts), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths[row] = len(tokens)
+            for token in tokens:
+                column = terms.get(token)
+                if column is not None:
+                    tf[row, column] += 1
+
+        present = tf > 0
+        df = present.sum(axis=0)
+        idf = np.log1p((len(texts) - df + 0.5) / (df + 0.5))
+        norm = self.k1 * (1 - self.b + self.b * lengths / max(float(lengths.mean()), 1.0))
+        bm25 = (tf * (self.k1 + 1) / (tf + norm[:, None])) @ idf
+        coverage = (present @ idf) / max(float(idf.sum()), 1e-9)
+        return bm25 * (1 + coverage)
+
+
+class CrossEncoderReranker(ScoringReranker):
+    """Re-ranks candidates with a local sentence-transformers cross-encoder, scoring (query, chunk) pairs in batches."""
+
+    model: Any
+    batch_size: int = 32
+
+    def score(self, query: str, texts: List[str]) -> np.ndarray:
+        scores = self.model.predict(
+            [(query, text) for text in texts], batch_size=self.batch_size, show_progress_bar=False
+        )
+        return np.asarray(scores, dtype=np.float32)
+
+
+_cross_encoders = {}
+_cross_encoders_lock = threading.Lock()
+
+
+def load_cross_encoder(model_name: str):
+    """Load a cross-encoder once per process; it runs on the CPU unless a GPU is available."""
+    with _cross_encoders_lock:
+        if model_name not in _cross_encoders:
+            # Imported here so the lexical reranker works without sentence-transformers and torch
+            from sentence_transformers import CrossEncoder
+            logger.info(f"Loading cross-encoder '{model_name}'")
+            _cross_encoders[model_name] = CrossEncoder(model_name)
+        return _cross_encoders[model_name]
+
+
+RERANKERS = ("none", "lexical", "cross_encoder")
+
+
+def create_reranker(kind: str, top_n: int, model_name: str, batch_size: int = 32) -> Optional[ScoringReranker]:
+    """Build the reranker selected by ``kind``, or None for ``"none"``."""
+    if kind == "none":
+        return None
+    if kind == "lexical":
+        return LexicalReranker(top_n=top_n)
+    if kind == "cross_encoder":
+        return CrossEncoderReranker(model=load_cross_encoder(model_name), top_n=top_n, batch_size=batch_size)
+    raise ValueError(f"Unknown reranker '{kind}'. Available: {list(RERANKERS)}")
@@ -0,0 +1,43 @@
+from collections import defaultdict
+from typing import Dict, List
+
+from langchain.retrievers import EnsembleRetriever
+from langchain.schema import Document
+
+
+class ScoredEnsembleRetriever(EnsembleRetriever):
+    """EnsembleRetriever that keeps the fused scores on the documents it returns.
+
+    Each returned document carries its weighted reciprocal rank score under
+    ``metadata["ensemble_score"]``. When several retrievers return the same
+    chunk, their metadata is merged onto the copy that is kept.
+
+    Chunks are identified by their text, so a chunk that several uploaded
+    files share is returned once; within one retriever's list only its
+    best-ranked copy counts towards the fused score.
+    """
+
+    def weighted_reciprocal_rank(self, doc_lists: List[List[Document]]) -> List[Document]:
+        if len(doc_lists) != len(self.weights):
+            raise ValueError("Number of rank lists must be equal to the number of weights.")
+
+        scores: Dict[str, float] = defaultdict(float)
+        kept: Dict[str, Document] = {}
+        for doc_list, weight in zip(doc_lists, self.weights):
+            listed = set()
+            for rank, doc in enumerate(doc_list, start=1):
+                key = doc.page_content if self.id_key is None else doc.metadata[self.id_key]
+                if key in listed:
+                    continue
+                listed.add(key)
+                scores[key] += weight / (rank + self.c)
+                if key in kept:
+                    for name, value in doc.metadata.items():
+                        kept[key].metadata.setdefault(name, value)
+                else:
+                    kept[key] = doc
+
+        ranked = sorted(kept, key=scores.get, reverse=True)
+        for key in ranked:
+            kept[key].metadata["ensemble_score"] = scores[key]
+        return [kept[key] for key in ranked]
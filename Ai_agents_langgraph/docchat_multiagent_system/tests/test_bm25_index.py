@@ -0,0 +1,129 @@
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("langchain_core")
+
+from langchain.schema import Document
+
+from retriever.bm25_index import BM25Index
+
+
+def chunks(doc_hash, *texts):
+    return [Document(page_content=text, metadata={"doc_hash": doc_hash}) for text in texts]
+
+
+def contents(results):
+    return [doc.page_content for doc in results]
+
+
+@pytest.fixture
+def index():
+    index = BM25Index()
+    index.add_document("a", chunks("a", "solar panels convert sunlight", "wind turbines spin"))
+    index.add_document("b", chunks("b", "solar farms need land", "batteries store energy"))
+    index.add_document("c", chunks("c", "hydro dams store water"))
+    return index
+
+
+def test_add_and_search(index):
+    results = index.search("solar", k=5)
+    assert sorted(contents(results)) == ["solar farms need land", "solar panels convert sunlight"]
+    assert all(doc.metadata["bm25_score"] > 0 for doc in results)
+    assert len(index) == 5
+    assert index.doc_hashes == {"a", "b", "c"}
+
+
+def test_adding_a_document_twice_is_a_no_op(index):
+    index.add_document("a", chunks("a", "something else entirely"))
+    assert len(index) == 5
+    assert index.search("entirely", k=5) == []
+
+
+def test_search_limited_to_documents(index):
+    assert contents(index.search("store", k=5, doc_hashes=["c"])) == ["hydro dams store water"]
+    assert index.search("store", k=5, doc_hashes=["missing"]) == []
+
+
+def test_remove_document(index):
+    index.remove_document("b")
+    assert "b" not in index
+    assert len(index) == 3
+    assert contents(index.search("solar", k=5)) == ["solar panels convert sunlight"]
+    assert index.search("batteries", k=5) == []
+
+
+def test_compact_keeps_live_results(index):
+    index.remove_document("a")
+    before = [(doc.page_content, doc.metadata) for doc in index.search("store solar", k=5)]
+    index.compact()
+    after = [(doc.page_content, doc.metadata) for doc in index.search("store solar", k=5)]
+    assert after == before
+    assert index.doc_hashes == {"b", "c"}
+
+    # Slots are renumbered; removing and adding documents still works afterwards
+    index.remove_document("c")
+    index.add_document("d", chunks("d", "tidal power store"))
+    assert contents(index.search("store", k=5, doc_hashes=["d"])) == ["tidal power store"]
+    assert sorted(contents(index.search("store", k=5))) == ["batteries store energy", "tidal power store"]
+
+
+def test_save_and_load_round_trip(index, tmp_path):
+    index.remove_document("c")
+    index.save(str(tmp_path))
+    loaded = BM25Index.load(str(tmp_path))
+
+    assert loaded.doc_hashes == index.doc_hashes
+    assert len(loaded) == len(index)
+    for query in ("solar", "store energy", "wind"):
+        assert [(d.page_content, d.metadata) for d in loaded.search(query, k=5)] == \
+            [(d.page_content, d.metadata) for d in index.search(query, k=5)]
+
+    loaded.remove_document("a")
+    loaded.add_document("e", chunks("e", "geothermal heat"))
+    assert sorted(contents(loaded.search("solar geothermal", k=5))) == ["geothermal heat", "solar farms need land"]
+
+
+def test_load_missing_directory_gives_empty_index(tmp_path):
+    index = BM25Index.load(str(tmp_path / "absent"))
+    assert len(index) == 0
+    assert index.search("anything", k=3) == []
+
+
+def test_scores_ignore_unrelated_documents(index):
+    before = [(d.page_content, d.metadata["bm25_score"]) for d in index.search("solar", k=5, doc_hashes=["a", "b"])]
+    index.add_document("other", chunks("other", *[f"unrelated filler text number {i} " * (i % 7 + 1) for i in range(100)]))
+    after = [(d.page_content, d.metadata["bm25_score"]) for d in index.search("solar", k=5, doc_hashes=["a", "b"])]
+    assert [c for c, _ in after] == [c for c, _ in before]
+    assert [s for _, s in after] == pytest.approx([s for _, s in before])
+
+
+@pytest.mark.parametrize("reopen", ["compact", "save_load"])
+def test_documents_without_chunks_survive_compaction_and_reload(index, tmp_path, reopen):
+    index.add_document("empty", [])
+    index.remove_document("a")
+    if reopen == "compact":
+        index.compact()
+    else:
+        index.save(str(tmp_path))
+        index = BM25Index.load(str(tmp_path))
+
+    assert "empty" in index
+    index.remove_document("empty")
+    assert "empty" not in index
+
+    # A new document gets a slot of its own and is searched on its own
+    index.add_document("new", chunks("new", "solar roof tiles"))
+    assert contents(index.search("solar", k=5, doc_hashes=["new"])) == ["solar roof tiles"]
+
+
+def test_new_document_after_reload_does_not_share_an_empty_documents_slot(tmp_path):
+    index = BM25Index()
+    index.add_document("a", chunks("a", "alpha text"))
+    index.add_document("empty", [])
+    index.save(str(tmp_path))
+    index = BM25Index.load(str(tmp_path))
+
+    index.add_document("b", chunks("b", "beta text"))
+    index.remove_document("empty")
+    assert contents(index.search("text", k=5, doc_hashes=["b"])) == ["beta text"]
+    assert sorted(contents(index.search("text", k=5))) == ["alpha text", "beta text"]
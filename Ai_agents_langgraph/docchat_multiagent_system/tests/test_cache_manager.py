@@ -0,0 +1,89 @@
+import json
+import time
+
+import pytest
+
+pytest.importorskip("loguru")
+
+from document_processor import cache_manager
+from document_processor.cache_manager import CacheManager
+
+
+def write_entry(cache_dir, name, size):
+    (cache_dir / name).write_bytes(b"x" * size)
+
+
+def record(cache, name, size):
+    write_entry(cache.cache_dir, name, size)
+    cache.record(name)
+    # Distinct timestamps keep the LRU order deterministic
+    time.sleep(0.01)
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = CacheManager(tmp_path, max_bytes=300, expire_days=7)
+    record(cache, "a.chunks", 100)
+    record(cache, "b.chunks", 100)
+    record(cache, "c.chunks", 100)
+    assert cache.lookup("a.chunks") == tmp_path / "a.chunks"
+    time.sleep(0.01)
+
+    record(cache, "d.chunks", 100)
+
+    assert not (tmp_path / "b.chunks").exists()
+    assert [entry["name"] for entry in cache.entries()] == ["c.chunks", "a.chunks", "d.chunks"]
+    assert cache.stats()["evictions"] == 1
+    assert cache.total_bytes() == 300
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = CacheManager(tmp_path, max_bytes=1000, expire_days=0)
+    record(cache, "a.chunks", 10)
+    assert cache.lookup("a.chunks") is None
+    assert not (tmp_path / "a.chunks").exists()
+    assert cache.stats()["misses"] == 1
+
+
+def test_prune_by_size(tmp_path):
+    cache = CacheManager(tmp_path, max_bytes=1000, expire_days=7)
+    for name in ("a.chunks", "b.chunks", "c.chunks"):
+        record(cache, name, 100)
+    assert cache.prune(max_bytes=150) == 2
+    assert [entry["name"] for entry in cache.entries()] == ["c.chunks"]
+
+
+def test_startup_adopts_entries_and_leaves_other_files_alone(tmp_path):
+    write_entry(tmp_path, "a.chunks", 100)
+    write_entry(tmp_path, "old.pkl", 100)
+    (tmp_path / "index.json").write_text(json.dumps({"gone.chunks": {"size": 5, "created": 0, "last_access": 0}}))
+
+    cache = CacheManager(tmp_path, max_bytes=1000, expire_days=7)
+
+    assert [entry["name"] for entry in cache.entries()] == ["a.chunks"]
+    assert (tmp_path / "old.pkl").exists()
+
+
+def test_shared_files_count_against_the_limit(tmp_path):
+    write_entry(tmp_path, "pages.sqlite3", 150)
+    write_entry(tmp_path, "pages.sqlite3-wal", 50)
+    cache = CacheManager(tmp_path, max_bytes=350, expire_days=7, shared_files=["pages.sqlite3"])
+    record(cache, "a.chunks", 100)
+    record(cache, "b.chunks", 100)
+
+    assert cache.stats()["shared_bytes"] == 200
+    assert [entry["name"] for entry in cache.entries()] == ["b.chunks"]
+    assert (tmp_path / "pages.sqlite3").exists()
+
+
+def test_lookups_write_the_index_at_most_once_per_interval(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_manager, "INDEX_SAVE_INTERVAL", 3600.0)
+    cache = CacheManager(tmp_path, max_bytes=1000, expire_days=7)
+    record(cache, "a.chunks", 10)
+    saved = json.loads((tmp_path / "index.json").read_text())
+
+    assert cache.lookup("a.chunks") is not None
+    assert json.loads((tmp_path / "index.json").read_text()) == saved
+
+    cache.flush()
+    flushed = json.loads((tmp_path / "index.json").read_text())
+    assert flushed["a.chunks"]["last_access"] > saved["a.chunks"]["last_access"]
@@ -0,0 +1,44 @@
+import pytest
+
+pytest.importorskip("langchain")
+
+from langchain.schema import Document
+
+from document_processor.chunk_store import load_chunks, save_chunks
+
+
+def test_save_and_load_round_trip(tmp_path):
+    chunks = [
+        Document(page_content="# Intro\nPlain ASCII text.", metadata={"Header 1": "Intro", "doc_hash": "abc"}),
+        Document(page_content="Überschrift – naïve café, 数据", metadata={"Header 2": "Ünïcode"}),
+        Document(page_content="", metadata={}),
+    ]
+    path = tmp_path / "entry.chunks"
+    save_chunks(path, chunks, created=123.0)
+
+    loaded = load_chunks(path)
+    assert [(c.page_content, c.metadata) for c in loaded] == [(c.page_content, c.metadata) for c in chunks]
+    assert not path.with_name(path.name + ".tmp").exists()
+
+
+def test_load_a_slice(tmp_path):
+    chunks = [Document(page_content=f"chunk {i}", metadata={"i": i}) for i in range(5)]
+    path = tmp_path / "entry.chunks"
+    save_chunks(path, chunks, created=0.0)
+
+    assert [c.page_content for c in load_chunks(path, 1, 3)] == ["chunk 1", "chunk 2"]
+    assert [c.metadata["i"] for c in load_chunks(path, start=3)] == [3, 4]
+
+
+def test_empty_store(tmp_path):
+    path = tmp_path / "empty.chunks"
+    save_chunks(path, [], created=0.0)
+    assert load_chunks(path) == []
+
+
+@pytest.mark.parametrize("content", [b"", b"DCC", b"PK\x03\x04" + b"\x00" * 32])
+def test_foreign_files_are_rejected(tmp_path, content):
+    path = tmp_path / "bad.chunks"
+    path.write_bytes(content)
+    with pytest.raises(ValueError):
+        load_chunks(path)
@@ -0,0 +1,101 @@
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("langchain_community")
+
+import langchain_community.vectorstores
+from langchain.schema import Document
+
+from retriever.index_manager import IndexManager
+
+
+class FakeChroma:
+    """In-memory stand-in for the few Chroma calls IndexManager makes; collections persist per directory."""
+
+    stores = {}
+
+    def __init__(self, collection_name, embedding_function, persist_directory):
+        self.records = self.stores.setdefault(persist_directory, {})
+        self.added = []
+
+    def get(self, include=None, where=None):
+        items = [
+            (record_id, doc) for record_id, doc in self.records.items()
+            if where is None or all(doc.metadata.get(key) == value for key, value in where.items())
+        ]
+        return {"ids": [i for i, _ in items], "metadatas": [doc.metadata for _, doc in items]}
+
+    def add_documents(self, documents, ids):
+        self.added.extend(doc.metadata["doc_hash"] for doc in documents)
+        self.records.update(zip(ids, documents))
+
+    def delete(self, ids):
+        for record_id in ids:
+            self.records.pop(record_id, None)
+
+
+def chunks(doc_hash, *texts):
+    return [Document(page_content=text, metadata={"doc_hash": doc_hash}) for text in texts]
+
+
+@pytest.fixture
+def open_manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(langchain_community.vectorstores, "Chroma", FakeChroma)
+    monkeypatch.setattr(FakeChroma, "stores", {})
+    return lambda: IndexManager(
+        embeddings=None,
+        persist_directory=str(tmp_path / "chroma"),
+        collection_name="documents",
+        bm25_directory=str(tmp_path / "bm25")
+    )
+
+
+@pytest.fixture
+def manager(open_manager):
+    return open_manager()
+
+
+def stored_hashes(manager):
+    return {m["doc_hash"] for m in manager.vector_store.get()["metadatas"]}
+
+
+def test_shared_document_is_released_with_its_last_file_set(manager):
+    set_a = manager.sync(frozenset(), chunks("a", "alpha report") + chunks("shared", "common appendix"))
+    set_b = manager.sync(frozenset(), chunks("shared", "common appendix") + chunks("b", "beta report"))
+
+    # The shared document is embedded once and searchable from both sets
+    assert manager.vector_store.added.count("shared") == 1
+    assert stored_hashes(manager) == {"a", "b", "shared"}
+
+    manager.release(set_a)
+    assert stored_hashes(manager) == {"b", "shared"}
+    assert "shared" in manager.bm25_index and "a" not in manager.bm25_index
+    assert [d.page_content for d in manager.bm25_index.search("appendix", k=3, doc_hashes=set_b)] == ["common appendix"]
+
+    manager.release(set_b)
+    assert stored_hashes(manager) == set()
+    assert len(manager.bm25_index) == 0
+
+
+def test_sync_moves_a_file_set(manager):
+    first = manager.sync(frozenset(), chunks("a", "alpha") + chunks("b", "beta"))
+    second = manager.sync(first, chunks("b", "beta") + chunks("c", "gamma"))
+
+    assert second == {"b", "c"}
+    assert stored_hashes(manager) == {"b", "c"}
+    assert manager.vector_store.added.count("b") == 1
+
+
+def test_documents_left_by_an_earlier_process_are_deleted(open_manager):
+    earlier = open_manager()
+    earlier.sync(frozenset(), chunks("a", "alpha report") + chunks("b", "beta report"))
+
+    manager = open_manager()
+
+    assert stored_hashes(manager) == set()
+    assert len(manager.bm25_index) == 0
+    # A re-upload indexes the document again and references it as usual
+    file_set = manager.sync(frozenset(), chunks("a", "alpha report"))
+    assert stored_hashes(manager) == {"a"}
+    manager.release(file_set)
+    assert stored_hashes(manager) == set()
@@ -0,0 +1,97 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("langchain_core")
+
+from langchain.schema import Document
+
+from retriever.registry import RetrieverRegistry
+
+
+class FakeIndexManager:
+    def __init__(self):
+        self.released = []
+
+    def release(self, doc_hashes):
+        self.released.append(frozenset(doc_hashes))
+
+
+class FakeBuilder:
+    def __init__(self):
+        self.builds = 0
+        self.embeddings = SimpleNamespace(dimension=4)
+        self.index_manager = FakeIndexManager()
+
+    def build_hybrid_retriever_streaming(self, documents):
+        self.builds += 1
+        doc_hashes = frozenset(doc_hash for doc_hash, _ in documents)
+        return SimpleNamespace(metadata={"doc_hashes": doc_hashes})
+
+
+def loader(*doc_hashes):
+    return lambda: [(h, [Document(page_content=f"text of {h}", metadata={"doc_hash": h})]) for h in doc_hashes]
+
+
+def test_sessions_share_one_retriever():
+    builder = FakeBuilder()
+    registry = RetrieverRegistry(builder, max_bytes=10 ** 9)
+    first = registry.acquire(frozenset({"a", "b"}), loader("a", "b"))
+    second = registry.acquire(frozenset({"a", "b"}), loader("a", "b"))
+
+    assert builder.builds == 1
+    assert second.retriever is first.retriever
+    assert registry.stats()["in_use"] == 1
+
+
+def test_retriever_is_kept_while_referenced():
+    builder = FakeBuilder()
+    registry = RetrieverRegistry(builder, max_bytes=0)
+    first = registry.acquire(frozenset({"a"}), loader("a"))
+    second = registry.acquire(frozenset({"a"}), loader("a"))
+
+    first.release()
+    first.release()  # Releasing a handle twice drops only one reference
+    assert registry.stats()["retrievers"] == 1
+    assert builder.index_manager.released == []
+
+    second.release()
+    assert registry.stats()["retrievers"] == 0
+    assert builder.index_manager.released == [frozenset({"a"})]
+
+
+def test_idle_retrievers_are_evicted_least_recently_used_first():
+    builder = FakeBuilder()
+    registry = RetrieverRegistry(builder, max_bytes=10 ** 9)
+    for doc_hash in ("a", "b", "c"):
+        registry.acquire(frozenset({doc_hash}), loader(doc_hash)).release()
+    registry.acquire(frozenset({"a"}), loader("a")).release()
+    size = registry.stats()["bytes"] // 3
+
+    registry.max_bytes = 2 * size
+    registry.acquire(frozenset({"d"}), loader("d"))
+
+    assert builder.index_manager.released == [frozenset({"b"}), frozenset({"c"})]
+    assert registry.stats()["retrievers"] == 2
+
+
+def test_size_estimate_counts_vectors_and_postings():
+    builder = FakeBuilder()
+    registry = RetrieverRegistry(builder, max_bytes=10 ** 9)
+    registry.acquire(frozenset({"a"}), loader("a"))
+    text_bytes = len("text of a".encode("utf-8"))
+
+    # Beyond the text: a 4-dimensional float32 vector and three BM25 postings
+    assert registry.stats()["bytes"] >= text_bytes + 4 * 4 + 3 * 8
+
+
+def test_documents_are_released_outside_the_registry_lock():
+    builder = FakeBuilder()
+    registry = RetrieverRegistry(builder, max_bytes=0)
+    held = []
+    builder.index_manager.release = lambda doc_hashes: held.append(registry._lock.locked())
+
+    registry.acquire(frozenset({"a"}), loader("a")).release()
+
+    assert held == [False]
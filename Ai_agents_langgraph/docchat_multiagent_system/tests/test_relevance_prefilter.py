@@ -0,0 +1,39 @@
+import math
+
+import numpy as np
+import pytest
+
+pytest.importorskip("langchain")
+
+from langchain.schema import Document
+
+from agents.relevance_prefilter import RelevancePreClassifier, cosine_similarity
+
+
+def chroma_relevance(cosine: float) -> float:
+    """Relevance LangChain reports for two unit vectors with the given cosine in Chroma's "l2" space."""
+    a = np.array([1.0, 0.0])
+    b = np.array([cosine, math.sqrt(1.0 - cosine ** 2)])
+    squared_l2 = float(np.sum((a - b) ** 2))  # Chroma's "l2" distance is squared
+    return 1.0 - squared_l2 / math.sqrt(2)  # LangChain's euclidean relevance function
+
+
+@pytest.mark.parametrize("cosine", [-0.5, 0.0, 0.2, 0.3, 0.5, 0.8, 0.95, 1.0])
+def test_cosine_similarity_inverts_chroma_relevance(cosine):
+    assert cosine_similarity(chroma_relevance(cosine)) == pytest.approx(cosine)
+
+
+def test_low_cosines_have_negative_relevance():
+    assert chroma_relevance(0.2) < 0
+    assert cosine_similarity(chroma_relevance(0.2)) == pytest.approx(0.2)
+
+
+def test_features_report_cosine_similarity():
+    classifier = RelevancePreClassifier(0.1, 0.3, 1.0, 0.8, 0.8, 3.0)
+    documents = [
+        Document(page_content="solar panel output", metadata={"vector_score": chroma_relevance(0.3)}),
+        Document(page_content="wind farm", metadata={"vector_score": chroma_relevance(0.8)}),
+    ]
+    features = classifier.features("solar output", documents)
+    assert features["similarity"] == pytest.approx(0.8)
+    assert features["best_coverage"] == 1.0
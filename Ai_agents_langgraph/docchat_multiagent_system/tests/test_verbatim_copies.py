@@ -0,0 +1,25 @@
+from pathlib import Path
+
+import pytest
+
+# The apps are separate projects, so these modules are copied into each of them and kept identical
+REPO_ROOT = Path(__file__).resolve().parents[3]
+COPIES = {
+    "embedding_executor.py": [
+        "Ai_agents_langgraph/docchat_multiagent_system/retriever",
+        "Advanced_rag_with_vecror_db_retriever/youtube_qa_bot",
+        "Build_rag_applications/rag_app_icebreaker/modules",
+    ],
+    "backends.py": [
+        "Ai_agents_langgraph/docchat_multiagent_system/utils",
+        "Advanced_rag_with_vecror_db_retriever/youtube_qa_bot",
+        "Vector_databases_for_rag/interactive_food_search",
+        "Build_rag_applications/rag_app_icebreaker/modules",
+    ],
+}
+
+
+@pytest.mark.parametrize("name", sorted(COPIES))
+def test_copies_are_identical(name):
+    contents = {directory: (REPO_ROOT / directory / name).read_bytes() for directory in COPIES[name]}
+    assert len(set(contents.values())) == 1, f"{name} differs between {sorted(contents)}"
@@ -0,0 +1,170 @@
+"""Chat and embedding backends with deterministic local stand-ins.
+
+"groq" and "mistral" are the hosted providers; "fake" and "hashing" are
+deterministic local stand-ins for profiling and load tests without
+network access or API keys. Apps add their own backends with
+``register_chat_backend`` and ``register_embedding_backend``.
+
+This module is kept byte-identical in DocChat (utils/), the YouTube bot,
+the food search chatbot and the icebreaker bot (modules/); change every
+copy together.
+"""
+import hashlib
+import re
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic local chat model with configurable latency and token rate.
+
+    The reply is the response of the first rule whose pattern occurs in the
+    prompt, else ``default_response``. Replies are emitted at
+    ``tokens_per_second`` after ``first_token_latency`` seconds, so
+    streaming and concurrency behave like a remote model without a network.
+    """
+
+    rules: List[Tuple[str, str]] = []
+    default_response: str = "This is a stand-in answer based on the provided context [1]."
+    first_token_latency: float = 0.2
+    tokens_per_second: float = 50.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        prompt = "\n".join(str(message.content) for message in messages)
+        for pattern, response in self.rules:
+            if pattern in prompt:
+                return response
+        return self.default_response
+
+    def _usage(self, messages: List[BaseMessage], reply: str) -> Dict[str, int]:
+        input_tokens = sum(len(_TOKEN_RE.findall(str(message.content))) for message in messages)
+        output_tokens = len(_TOKEN_RE.findall(reply))
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        reply = self._reply(messages)
+        time.sleep(self.first_token_latency + len(_TOKEN_RE.findall(reply)) / self.tokens_per_second)
+        message = AIMessage(content=reply, usage_metadata=self._usage(messages, reply))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        reply = self._reply(messages)
+        time.sleep(self.first_token_latency)
+        for piece in re.findall(r"\S+\s*", reply):
+            time.sleep(1 / self.tokens_per_second)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece))
+            if run_manager:
+                run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, reply)))
+
+
+def hashing_vector(text: str, dimension: int) -> List[float]:
+    """Unit vector from hashed word unigrams and bigrams; texts that share words get similar vectors."""
+    words = re.findall(r"\w+", text.lower())
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    vector = np.zeros(dimension, dtype=np.float32)
+    for feature in features:
+        digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+        index = int.from_bytes(digest[:4], "little") % dimension
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tolist()
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic embeddings built on ``hashing_vector``.
+
+    Enough to exercise vector search without a model. ``latency`` adds a
+    fixed delay per call.
+    """
+
+    def __init__(self, dimension: int = 384, latency: float = 0.0):
+        self.dimension = dimension
+        self.latency = latency
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            time.sleep(self.latency)
+        return [hashing_vector(text, self.dimension) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def _groq_chat(model: str, **kwargs):
+    from langchain_groq import ChatGroq
+    return ChatGroq(model=model, **kwargs)
+
+
+def _fake_chat(model: str, rules: Sequence[Tuple[str, str]] = (), first_token_latency: float = 0.2,
+               tokens_per_second: float = 50.0, **_):
+    return FakeChatModel(rules=list(rules), first_token_latency=first_token_latency,
+                         tokens_per_second=tokens_per_second)
+
+
+def _mistral_embeddings(model: str, **_):
+    from langchain_mistralai import MistralAIEmbeddings
+    return MistralAIEmbeddings(model=model)
+
+
+def _hashing_embeddings(model: str, dimension: int = 384, latency: float = 0.0, **_):
+    return HashingEmbeddings(dimension=dimension, latency=latency)
+
+
+CHAT_BACKENDS: Dict[str, Callable[..., Any]] = {"groq": _groq_chat, "fake": _fake_chat}
+EMBEDDING_BACKENDS: Dict[str, Callable[..., Any]] = {"mistral": _mistral_embeddings, "hashing": _hashing_embeddings}
+
+
+def register_chat_backend(name: str, factory: Callable[..., Any]) -> None:
+    CHAT_BACKENDS[name] = factory
+
+
+def register_embedding_backend(name: str, factory: Callable[..., Any]) -> None:
+    EMBEDDING_BACKENDS[name] = factory
+
+
+def create_chat_model(backend: str, model: str, **kwargs):
+    """Build a chat model from a registered backend ("groq", or the local "fake" stand-in).
+
+    Options a backend does not use are ignored by the local stand-ins.
+    """
+    try:
+        factory = CHAT_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown chat backend '{backend}'. Available: {sorted(CHAT_BACKENDS)}") from None
+    return factory(model, **kwargs)
+
+
+def create_embeddings(backend: str, model: str, **kwargs):
+    """Build an embeddings model from a registered backend ("mistral", or the local "hashing" stand-in)."""
+    try:
+        factory = EMBEDDING_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown embedding backend '{backend}'. Available: {sorted(EMBEDDING_BACKENDS)}") from None
+    return factory(model, **kwargs)
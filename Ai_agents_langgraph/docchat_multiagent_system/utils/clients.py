@@ -0,0 +1,98 @@
+import threading
+from functools import lru_cache
+from typing import Callable
+
+from config.settings import settings
+from utils.backends import create_chat_model, create_embeddings
+from utils.logging import logger
+
+_env_lock = threading.Lock()
+_env_loaded = False
+
+
+def load_environment() -> None:
+    """Load ``.env`` into the process environment, once."""
+    global _env_loaded
+    with _env_lock:
+        if not _env_loaded:
+            from dotenv import load_dotenv
+            load_dotenv()
+            _env_loaded = True
+
+
+@lru_cache(maxsize=None)
+def get_http_clients():
+    """Connection-pooled httpx clients (sync, async) shared by every chat model."""
+    import httpx
+
+    limits = httpx.Limits(
+        max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_HTTP_MAX_CONNECTIONS
+    )
+    return httpx.Client(limits=limits), httpx.AsyncClient(limits=limits)
+
+
+# Canned replies that let the "fake" backend drive the full DocChat workflow offline
+FAKE_CHAT_RULES = [
+    ('Respond ONLY with "CAN_ANSWER"', "CAN_ANSWER"),
+    ("Verify the following answer", "Supported: YES\nUnsupported Claims: []\nContradictions: []\nRelevant: YES"),
+]
+
+
+@lru_cache(maxsize=None)
+def get_chat_model(model_id: str, temperature: float = 0):
+    """Shared chat client per (model, temperature); agents using the same model reuse one client.
+
+    The backend comes from ``settings.LLM_BACKEND``. Retries are left to
+    the LLM gateway, which applies them under the shared rate limit.
+    """
+    load_environment()
+    logger.info(f"Creating {settings.LLM_BACKEND} chat client for {model_id}")
+    if settings.LLM_BACKEND != "groq":
+        return create_chat_model(
+            settings.LLM_BACKEND,
+            model_id,
+            rules=FAKE_CHAT_RULES,
+            first_token_latency=settings.FAKE_LLM_LATENCY,
+            tokens_per_second=settings.FAKE_LLM_TOKENS_PER_SECOND
+        )
+
+    http_client, http_async_client = get_http_clients()
+    return create_chat_model("groq", model_id,
+        temperature=temperature,
+        max_tokens=None,
+        timeout=None,
+        max_retries=0,
+        http_client=http_client,
+        http_async_client=http_async_client,
+        verbose=1)
+
+
+@lru_cache(maxsize=None)
+def get_embeddings(model: str):
+    """Shared embeddings client per model, from ``settings.EMBEDDING_BACKEND``."""
+    load_environment()
+    logger.info(f"Creating {settings.EMBEDDING_BACKEND} embeddings client for {model}")
+    return create_embeddings(
+        settings.EMBEDDING_BACKEND,
+        model,
+        dimension=settings.HASHING_EMBEDDING_DIM
+    )
+
+
+def warm_up(*steps: Callable[[], object]) -> threading.Thread:
+    """Run initialization steps in a background daemon thread so the first request finds them ready.
+
+    Each step is run independently; a failing step is logged and does not stop the others.
+    """
+    def run():
+        for step in steps:
+            try:
+                step()
+            except Exception as e:
+                logger.warning(f"Warm-up step {getattr(step, '__name__', step)} failed: {e}")
+        logger.info("Warm-up finished")
+
+    thread = threading.Thread(target=run, name="warm-up", daemon=True)
+    thread.start()
+    return thread
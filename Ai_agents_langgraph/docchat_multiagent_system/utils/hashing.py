@@ -0,0 +1,43 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+HASH_CHUNK_SIZE = 1024 * 1024
+_MEMO_MAX_ENTRIES = 1024
+
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def file_path(file) -> str:
+    """Uploaded files arrive either as paths or as tempfile wrappers with a ``name``."""
+    return file if isinstance(file, (str, os.PathLike)) else file.name
+
+
+def hash_file(path) -> str:
+    """SHA-256 of a file, read in fixed-size chunks so it is never fully loaded into memory.
+
+    Digests are memoized on (path, size, mtime), so a file that has not
+    changed since it was last hashed is not read again.
+    """
+    path = os.fspath(path)
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _memo_lock:
+        digest = _memo.get(key)
+        if digest is not None:
+            _memo.move_to_end(key)
+            return digest
+
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            hasher.update(block)
+    digest = hasher.hexdigest()
+
+    with _memo_lock:
+        _memo[key] = digest
+        while len(_memo) > _MEMO_MAX_ENTRIES:
+            _memo.popitem(last=False)
+    return digest
@@ -0,0 +1,289 @@
+import asyncio
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from langchain_core.runnables import Runnable
+
+from config.settings import settings
+from utils.clients import get_chat_model
+from utils.logging import logger
+from utils.tracing import tracer
+
+
+class RateLimiter:
+    """Caps concurrent LLM calls and paces them with a token bucket, for sync and async callers alike."""
+
+    def __init__(self, max_concurrency: int, requests_per_minute: float):
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._rate = requests_per_minute / 60.0
+        self._capacity = max(1.0, min(float(max_concurrency), requests_per_minute))
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a request token if one is available; otherwise return how long to wait for one."""
+        if self._rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self._rate
+
+    @contextmanager
+    def slot(self):
+        self._slots.acquire()
+        try:
+            while (wait := self._reserve()) > 0:
+                time.sleep(wait)
+            yield
+        finally:
+            self._slots.release()
+
+    @asynccontextmanager
+    async def aslot(self):
+        # Polled rather than awaited in a thread, so a cancelled task never strands a slot
+        while not self._slots.acquire(blocking=False):
+            await asyncio.sleep(0.05)
+        try:
+            while (wait := self._reserve()) > 0:
+                await asyncio.sleep(wait)
+            yield
+        finally:
+            self._slots.release()
+
+
+class LLMMetrics:
+    """Per-agent call counts, latencies and token usage."""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._latencies = defaultdict(lambda: deque(maxlen=window))
+        self._counters = defaultdict(lambda: defaultdict(int))
+
+    def record(self, agent: str, model: str, seconds: float, usage: Optional[Dict], error: bool = False) -> None:
+        usage = usage or {}
+        with self._lock:
+            counters = self._counters[agent]
+            counters["calls"] += 1
+            counters["errors"] += int(error)
+            counters["input_tokens"] += usage.get("input_tokens", 0)
+            counters["output_tokens"] += usage.get("output_tokens", 0)
+            if not error:
+                self._latencies[agent].append(seconds)
+        logger.debug(
+            f"LLM call agent={agent} model={model} seconds={seconds:.2f} error={error} "
+            f"input_tokens={usage.get('input_tokens', 0)} output_tokens={usage.get('output_tokens', 0)}"
+        )
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            result = {}
+            for agent, counters in self._counters.items():
+                latencies = sorted(self._latencies[agent])
+                result[agent] = {
+                    **counters,
+                    "p50_seconds": _percentile(latencies, 0.50),
+                    "p95_seconds": _percentile(latencies, 0.95),
+                }
+            return result
+
+
+def _percentile(values, q: float) -> Optional[float]:
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _is_rate_limited(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429 or "RateLimit" in type(error).__name__
+
+
+def _backoff(attempt: int) -> float:
+    return min(30.0, 2 ** attempt) + random.uniform(0, 0.5)
+
+
+class GatedChatModel(Runnable):
+    """Chat model wrapper that routes every call through the shared limiter and metrics.
+
+    Rate-limited calls are retried here, with backoff, instead of in each client.
+    Each attempt is traced as an ``llm.<agent>`` span with its queueing time
+    and token usage.
+    """
+
+    def __init__(self, llm, agent: str, model: str, limiter: RateLimiter, metrics: LLMMetrics, max_retries: int):
+        self.llm = llm
+        self.agent = agent
+        self.model = model
+        self.limiter = limiter
+        self.metrics = metrics
+        self.max_retries = max_retries
+
+    def _span_attributes(self, attempt: int) -> Dict[str, Any]:
+        return {"agent": self.agent, "model": self.model, "attempt": attempt}
+
+    @staticmethod
+    def _trace_usage(span, usage: Optional[Dict]) -> None:
+        usage = usage or {}
+        span.set(input_tokens=usage.get("input_tokens", 0), output_tokens=usage.get("output_tokens", 0))
+
+    def invoke(self, input, config=None, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            try:
+                with tracer.span(f"llm.{self.agent}", **self._span_attributes(attempt)) as span:
+                    queued = time.perf_counter()
+                    with self.limiter.slot():
+                        start = time.perf_counter()
+                        span.set(queued_ms=(start - queued) * 1000)
+                        try:
+                            message = self.llm.invoke(input, config, **kwargs)
+                        except Exception:
+                            self.metrics.record(self.agent, self.model, time.perf_counter() - start, None, error=True)
+                            raise
+                        usage = getattr(message, "usage_metadata", None)
+                        self.metrics.record(self.agent, self.model, time.perf_counter() - start, usage)
+                        self._trace_usage(span, usage)
+                        return message
+            except Exception as e:
+                if not _is_rate_limited(e) or attempt == self.max_retries:
+                    raise
+                logger.warning(f"{self.agent}: rate limited, retrying (attempt {attempt + 1})")
+            time.sleep(_backoff(attempt))
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            try:
+                with tracer.span(f"llm.{self.agent}", **self._span_attributes(attempt)) as span:
+                    queued = time.perf_counter()
+                    async with self.limiter.aslot():
+                        start = time.perf_counter()
+                        span.set(queued_ms=(start - queued) * 1000)
+                        try:
+                            message = await self.llm.ainvoke(input, config, **kwargs)
+                        except asyncio.CancelledError:
+                            raise
+                        except Exception:
+                            self.metrics.record(self.agent, self.model, time.perf_counter() - start, None, error=True)
+                            raise
+                        usage = getattr(message, "usage_metadata", None)
+                        self.metrics.record(self.agent, self.model, time.perf_counter() - start, usage)
+                        self._trace_usage(span, usage)
+                        return message
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if not _is_rate_limited(e) or attempt == self.max_retries:
+                    raise
+                logger.warning(f"{self.agent}: rate limited, retrying (attempt {attempt + 1})")
+            await asyncio.sleep(_backoff(attempt))
+
+    def stream(self, input, config=None, **kwargs) -> Iterator:
+        for attempt in range(self.max_retries + 1):
+            started_output = False
+            # Started and finished explicitly: a context-managed span would stay current across yields
+            span = tracer.start_span(f"llm.{self.agent}", streaming=True, **self._span_attributes(attempt))
+            queued = time.perf_counter()
+            with self.limiter.slot():
+                start = time.perf_counter()
+                span.set(queued_ms=(start - queued) * 1000)
+                usage = defaultdict(int)
+                try:
+                    for chunk in self.llm.stream(input, config, **kwargs):
+                        if not started_output:
+                            span.set(first_token_ms=(time.perf_counter() - start) * 1000)
+                        started_output = True
+                        for key, value in (getattr(chunk, "usage_metadata", None) or {}).items():
+                            if isinstance(value, int):
+                                usage[key] += value
+                        yield chunk
+                except GeneratorExit:
+                    self._trace_usage(span, usage)
+                    tracer.finish(span)
+                    raise
+                except Exception as e:
+                    self.metrics.record(self.agent, self.model, time.perf_counter() - start, usage, error=True)
+                    tracer.finish(span, e)
+                    # Once tokens have reached the caller a retry would repeat them
+                    if started_output or not _is_rate_limited(e) or attempt == self.max_retries:
+                        raise
+                    logger.warning(f"{self.agent}: rate limited, retrying (attempt {attempt + 1})")
+                else:
+                    self.metrics.record(self.agent, self.model, time.perf_counter() - start, usage)
+                    self._trace_usage(span, usage)
+                    tracer.finish(span)
+                    return
+            time.sleep(_backoff(attempt))
+
+    async def astream(self, input, config=None, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            started_output = False
+            span = tracer.start_span(f"llm.{self.agent}", streaming=True, **self._span_attributes(attempt))
+            queued = time.perf_counter()
+            async with self.limiter.aslot():
+                start = time.perf_counter()
+                span.set(queued_ms=(start - queued) * 1000)
+                usage = defaultdict(int)
+                try:
+                    async for chunk in self.llm.astream(input, config, **kwargs):
+                        if not started_output:
+                            span.set(first_token_ms=(time.perf_counter() - start) * 1000)
+                        started_output = True
+                        for key, value in (getattr(chunk, "usage_metadata", None) or {}).items():
+                            if isinstance(value, int):
+                                usage[key] += value
+                        yield chunk
+                except (GeneratorExit, asyncio.CancelledError):
+                    self._trace_usage(span, usage)
+                    tracer.finish(span)
+                    raise
+                except Exception as e:
+                    self.metrics.record(self.agent, self.model, time.perf_counter() - start, usage, error=True)
+                    tracer.finish(span, e)
+                    if started_output or not _is_rate_limited(e) or attempt == self.max_retries:
+                        raise
+                    logger.warning(f"{self.agent}: rate limited, retrying (attempt {attempt + 1})")
+                else:
+                    self.metrics.record(self.agent, self.model, time.perf_counter() - start, usage)
+                    self._trace_usage(span, usage)
+                    tracer.finish(span)
+                    return
+            await asyncio.sleep(_backoff(attempt))
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+metrics = LLMMetrics()
+
+
+def _shared_limiter() -> RateLimiter:
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(settings.LLM_MAX_CONCURRENCY, settings.LLM_REQUESTS_PER_MINUTE)
+        return _limiter
+
+
+def model_for(agent: str) -> str:
+    """The model configured for an agent: its ``<AGENT>_MODEL`` setting if set, else ``LLM_MODEL``."""
+    return getattr(settings, f"{agent.upper()}_MODEL", None) or settings.LLM_MODEL
+
+
+def get_llm(agent: str) -> GatedChatModel:
+    """Chat model for ``agent`` behind the process-wide limiter, pooled HTTP clients and metrics."""
+    model = model_for(agent)
+    return GatedChatModel(
+        get_chat_model(model),
+        agent=agent,
+        model=model,
+        limiter=_shared_limiter(),
+        metrics=metrics,
+        max_retries=settings.LLM_MAX_RETRIES
+    )
@@ -0,0 +1,57 @@
+import queue
+import threading
+from contextvars import copy_context
+from typing import Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+def prefetch(iterable: Iterable[T], maxsize: int, name: str = "prefetch") -> Iterator[T]:
+    """Iterate ``iterable`` on a background thread, at most ``maxsize`` items ahead of the consumer.
+
+    The bounded queue is the backpressure: a slow consumer stalls the
+    producer instead of letting finished items pile up in memory. Errors
+    raised by the producer are re-raised to the consumer, and a consumer
+    that stops early makes the producer stop and close its iterator.
+    """
+    items = queue.Queue(maxsize=max(1, maxsize))
+    stop = threading.Event()
+
+    def put(item, error=None) -> bool:
+        while not stop.is_set():
+            try:
+                items.put((item, error), timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if not put(item):
+                    break
+            else:
+                put(_DONE)
+        except BaseException as e:
+            put(_DONE, e)
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    # Run in a copy of the caller's context so tracing spans nest under the caller's
+    threading.Thread(target=copy_context().run, args=(produce,), name=name, daemon=True).start()
+    try:
+        while True:
+            item, error = items.get()
+            if error is not None:
+                raise error
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        stop.set()
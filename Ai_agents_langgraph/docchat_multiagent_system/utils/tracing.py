@@ -0,0 +1,169 @@
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from config.settings import settings
+from utils.logging import logger
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("docchat_current_span", default=None)
+
+
+class Span:
+    """One timed operation. Field names follow the OpenTelemetry span data model."""
+
+    __slots__ = ("trace_id", "span_id", "parent_span_id", "name", "start_ns", "end_ns", "attributes", "status")
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent.span_id if parent else None
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes)
+        self.status = "OK"
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "status": self.status,
+        }
+
+
+class _NoopSpan:
+    trace_id = None
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Tracer:
+    """Records spans for workflow nodes, LLM calls and retrievals.
+
+    Finished spans are appended as JSON lines to ``path`` and kept in memory
+    for the most recent ``keep_traces`` traces, so ``summary`` can break a
+    request down by operation. ``span`` nests under the current span of the
+    calling context; ``start_span``/``finish`` are for work that spans
+    generator yields, where the current span must not leak to the consumer.
+    """
+
+    def __init__(self, path: str, enabled: bool = True, keep_traces: int = 100):
+        self.path = path
+        self.enabled = enabled
+        self.keep_traces = keep_traces
+        self._traces: "OrderedDict[str, List[Span]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._file = None
+
+    @contextmanager
+    def span(self, name: str, parent: Optional[Span] = None, **attributes: Any):
+        if not self.enabled:
+            yield _NOOP
+            return
+        span = self.start_span(name, parent, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "ERROR"
+            span.attributes["error"] = repr(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self.finish(span)
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attributes: Any):
+        if not self.enabled:
+            return _NOOP
+        return Span(name, parent or _current_span.get(), attributes)
+
+    def finish(self, span, error: Optional[BaseException] = None) -> None:
+        if not isinstance(span, Span):
+            return
+        if error is not None:
+            span.status = "ERROR"
+            span.attributes["error"] = repr(error)
+        span.end_ns = time.time_ns()
+        self._export(span)
+
+    def summary(self, trace_id: str) -> Dict[str, Any]:
+        """Per-request view: the spans of a trace in start order plus time totals per span name."""
+        with self._lock:
+            spans = sorted(self._traces.get(trace_id, []), key=lambda s: s.start_ns)
+        by_name = defaultdict(lambda: {"count": 0, "total_ms": 0.0})
+        for span in spans:
+            by_name[span.name]["count"] += 1
+            by_name[span.name]["total_ms"] += span.duration_ms
+        roots = [span for span in spans if span.parent_span_id is None]
+        return {
+            "trace_id": trace_id,
+            "total_ms": sum(span.duration_ms for span in roots),
+            "by_name": dict(by_name),
+            "spans": [span.to_dict() for span in spans],
+        }
+
+    def _export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            spans = self._traces.setdefault(span.trace_id, [])
+            spans.append(span)
+            self._traces.move_to_end(span.trace_id)
+            while len(self._traces) > self.keep_traces:
+                self._traces.popitem(last=False)
+            try:
+                if self._file is None:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+                self._file.write(line + "\n")
+            except OSError as e:
+                logger.warning(f"Could not write span to {self.path}: {e}")
+
+
+def current_span():
+    return _current_span.get() or _NOOP
+
+
+def iterate_in_span(span, iterable: Iterable) -> Iterator:
+    """Iterate with ``span`` as the current span while producing items, but not while the consumer holds them."""
+    context = copy_context()
+    if isinstance(span, Span):
+        context.run(_current_span.set, span)
+    iterator = iter(iterable)
+    try:
+        while True:
+            try:
+                item = context.run(next, iterator)
+            except StopIteration:
+                return
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            context.run(close)
+
+
+tracer = Tracer(settings.TRACE_PATH, enabled=settings.TRACING_ENABLED)
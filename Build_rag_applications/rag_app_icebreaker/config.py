@@ -1,5 +1,7 @@
 """Configuration settings for the Icebreaker Bot."""
 
+import os
+
 # IBM watsonx.ai settings
 WATSONX_URL = "https://us-south.ml.cloud.ibm.com"
 WATSONX_PROJECT_ID = "skills-network"
@@ -8,6 +10,10 @@ WATSONX_PROJECT_ID = "skills-network"
 LLM_MODEL_ID = "llama3-8b-8192"
 EMBEDDING_MODEL_ID = "mistral-embed"
 
+# Backend settings ("fake" and "hashing" are local stand-ins for offline benchmarking)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "groq")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "mistral")
+
 # ProxyCurl API settings
 PROXYCURL_API_KEY = ""  # Replace with your API key
 
@@ -25,6 +31,11 @@ TOP_P = 1
 # Node settings
 CHUNK_SIZE = 400
 
+# Embedding settings (requests are batched by estimated token count and sent concurrently)
+EMBEDDING_MAX_BATCH_TOKENS = 8000
+EMBEDDING_MAX_CONCURRENCY = 4
+EMBEDDING_REQUESTS_PER_MINUTE = 0
+
 # LLM prompt templates
 INITIAL_FACTS_TEMPLATE = """
 You are an AI assistant that provides detailed answers based on the provided context.
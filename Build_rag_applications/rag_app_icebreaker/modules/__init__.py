@@ -6,6 +6,7 @@ This package contains the following modules:
 - data_processing: Functions for processing and indexing LinkedIn profile data
 - llm_interface: Functions for interfacing with IBM watsonx.ai LLMs
 - query_engine: Functions for querying indexed LinkedIn profile data
+- backends: Hosted and local stand-in LLM and embedding backends
 """
 
 from modules.data_extraction import extract_linkedin_profile
@@ -6,7 +6,9 @@ from typing import Dict, List, Any, Optional
 
 from llama_index.core import Document, VectorStoreIndex
 from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import MetadataMode
 
+from modules.embedding_executor import EmbeddingExecutor
 from modules.llm_interface import create_watsonx_embedding
 import config
 
@@ -52,6 +54,17 @@ def create_vector_database(nodes: List) -> Optional[VectorStoreIndex]:
         # Get the embedding model
         embedding_model = create_watsonx_embedding()
 
+        # Embed the nodes in concurrent token-bounded batches; the index skips nodes that already have embeddings
+        executor = EmbeddingExecutor(
+            embedding_model.get_text_embedding_batch,
+            max_batch_tokens=config.EMBEDDING_MAX_BATCH_TOKENS,
+            max_concurrency=config.EMBEDDING_MAX_CONCURRENCY,
+            requests_per_minute=config.EMBEDDING_REQUESTS_PER_MINUTE
+        )
+        vectors = executor.embed([node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes])
+        for node, vector in zip(nodes, vectors):
+            node.embedding = vector.tolist()
+
         # Create a VectorStoreIndex from the nodes
         index = VectorStoreIndex(
             nodes=nodes,
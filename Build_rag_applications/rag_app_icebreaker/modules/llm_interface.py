@@ -2,37 +2,88 @@
 """Module for interfacing with IBM watsonx.ai LLMs."""
 
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
-from langchain_groq import ChatGroq
+from llama_index.core.base.embeddings.base import BaseEmbedding
 from llama_index.llms.langchain import LangChainLLM
-from llama_index.embeddings.mistralai import MistralAIEmbedding
 from ibm_watsonx_ai.foundation_models.utils.enums import DecodingMethods
 
+from modules.backends import (
+    FakeChatModel,
+    create_chat_model,
+    create_embeddings,
+    hashing_vector,
+    register_chat_backend,
+    register_embedding_backend
+)
 import config
 
 logger = logging.getLogger(__name__)
 
-def create_watsonx_embedding() -> MistralAIEmbedding:
+
+class HashingEmbedding(BaseEmbedding):
+    """Deterministic LlamaIndex embedding model built on ``hashing_vector``."""
+
+    dimension: int = 384
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "HashingEmbedding"
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return hashing_vector(query, self.dimension)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return hashing_vector(text, self.dimension)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._get_query_embedding(query)
+
+
+def _mistral_embedding(model: str, **kwargs):
+    from llama_index.embeddings.mistralai import MistralAIEmbedding
+    return MistralAIEmbedding(model=model)
+
+
+def _hashing_embedding(model: str, **kwargs):
+    return HashingEmbedding()
+
+
+def _fake_llm(model: str, **kwargs):
+    return FakeChatModel(default_response="Here are 3 interesting facts about this person's career and education.")
+
+
+# LlamaIndex needs its own embedding classes; chat models are LangChain ones wrapped in LangChainLLM
+register_embedding_backend("mistral", _mistral_embedding)
+register_embedding_backend("hashing", _hashing_embedding)
+register_chat_backend("fake", _fake_llm)
+
+
+def create_watsonx_embedding():
     """Creates an IBM Watsonx Embedding model for vector representation.
     
+    The backend is chosen by ``config.EMBEDDING_BACKEND``.
+    
     Returns:
         WatsonxEmbeddings model.
     """
-    watsonx_embedding = MistralAIEmbedding(
-        model=config.EMBEDDING_MODEL_ID
+    watsonx_embedding = create_embeddings(
+        config.EMBEDDING_BACKEND,
+        config.EMBEDDING_MODEL_ID
     )
     
-    logger.info(f"Created Watsonx Embedding model: {config.EMBEDDING_MODEL_ID}")
+    logger.info(f"Created {config.EMBEDDING_BACKEND} Embedding model: {config.EMBEDDING_MODEL_ID}")
     return watsonx_embedding
 
 
 def create_watsonx_llm(
     temperature: float = config.TEMPERATURE,
     max_new_tokens: int = config.MAX_NEW_TOKENS
-) -> ChatGroq:
+) -> LangChainLLM:
     """Creates an IBM Watsonx LLM for generating responses.
     
+    The backend is chosen by ``config.LLM_BACKEND``.
+    
     Args:
         temperature: Temperature for controlling randomness in generation (0.0 to 1.0).
         max_new_tokens: Maximum number of new tokens to generate.
@@ -43,7 +94,7 @@ def create_watsonx_llm(
     """
 
     
-    llm = ChatGroq(model=config.LLM_MODEL_ID,
+    llm = create_chat_model(config.LLM_BACKEND, config.LLM_MODEL_ID,
         temperature=temperature,
         max_tokens=max_new_tokens,
         timeout=None,
@@ -51,7 +102,7 @@ def create_watsonx_llm(
         verbose=1)
     watson_llm = LangChainLLM(llm=llm)
 
-    logger.info(f"Created LLM model: {config.LLM_MODEL_ID}")
+    logger.info(f"Created {config.LLM_BACKEND} LLM model: {config.LLM_MODEL_ID}")
     return watson_llm
 
 def change_llm_model(new_model_id: str) -> None:
@@ -4,7 +4,7 @@ from typing import List, Dict, Any
 import json
 import groq
 from groq import Groq
-from langchain_groq import ChatGroq
+from backends import create_chat_model
 import os
 from dotenv import load_dotenv
 
@@ -18,8 +18,8 @@ mistral_api_key = os.getenv("MISTRAL_API_KEY")
 
 #%%
 
-# Initialize the LLM model
-model = ChatGroq(model="llama3-8b-8192",
+# Initialize the LLM model (LLM_BACKEND=fake runs offline with a local stand-in)
+model = create_chat_model(os.getenv("LLM_BACKEND", "groq"), "llama3-8b-8192",
     temperature=0,
     max_tokens=None,
     timeout=None,
@@ -1,7 +1,8 @@
 import chromadb
 from chromadb.utils import embedding_functions
-from langchain_mistralai import MistralAIEmbeddings
+from backends import create_embeddings
 import json
+import os
 import re
 import numpy as np
 from typing import List, Dict, Any, Optional
@@ -9,6 +10,9 @@ from typing import List, Dict, Any, Optional
 # Initialize ChromaDB client
 client = chromadb.Client()
 
+# EMBEDDING_BACKEND=hashing embeds locally, without the Mistral API
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "mistral")
+
 def load_food_data(file_path: str) -> List[Dict]:
     """Load food data from JSON file"""
     try:
@@ -60,9 +64,7 @@ def create_similarity_search_collection(collection_name: str, collection_metadat
         pass
     
     # Create embedding function
-    sentence_transformer_ef = MistralAIEmbeddings(
-    model="mistral-embed",
-    )
+    sentence_transformer_ef = create_embeddings(EMBEDDING_BACKEND, "mistral-embed")
     
     # Create new collection
     return client.create_collection(
@@ -149,9 +151,7 @@ def create_similarity_search_collection(collection_name: str, collection_metadat
         pass
     
     # Create embedding function
-    sentence_transformer_ef = MistralAIEmbeddings(
-    model="mistral-embed",
-    )
+    sentence_transformer_ef = create_embeddings(EMBEDDING_BACKEND, "mistral-embed")
     
     # Create new collection
     return client.create_collection(